@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  bench_importtime.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+""" Import time of the viewer's modules, measured with 'python -X importtime'
+    in a fresh interpreter (best of REPEAT runs).
+    For each module the cumulative time is shown, together with its most
+    expensive imports, and whether it pulled in gi (GObject).
+
+        python3 bench_importtime.py [module ...]
+"""
+
+import os
+import subprocess
+import sys
+
+REPEAT = 5
+TOP = 5
+
+HEADLESS = ['povview_timing', 'povview_transform', 'povview_parser',
+            'povview_scenegen', 'povview_things', 'povview_profile']
+GUI = ['main_menu', 'povview_tiles', 'povview']
+
+
+def import_times(module):
+    """ Returns {imported module: (self us, cumulative us)} for every module
+        imported, plus the direct imports of 'module' as a list of
+        (cumulative us, name), or None if the module could not be imported
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    res = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                cwd = here, capture_output = True, text = True)
+    if res.returncode != 0:
+        return None
+
+    times, children, pending = {}, [], []
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumul_us, name = line[12:].split('|')
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        times[name] = (int(self_us), int(cumul_us))
+
+        # Nested imports are listed (indented) before their importer
+        if depth == 1:
+            pending.append((int(cumul_us), name))
+        elif depth == 0:
+            if name == module:
+                children = pending
+            pending = []
+    return times, children
+
+
+def bench(module):
+    best = None
+    for r in range(REPEAT):
+        res = import_times(module)
+        if res is None:
+            return None
+        if best is None or res[0][module][1] < best[0][module][1]:
+            best = res
+    return best
+
+
+def main(args):
+    modules = args[1:] or HEADLESS + GUI
+    for module in modules:
+        res = bench(module)
+        if res is None:
+            print(f'{module:<20} import failed')
+            continue
+        times, children = res
+
+        gi = 'gi' in times
+        flag = '  ** imports gi **' if gi and module in HEADLESS else ''
+        print(f'{module:<20} {times[module][1]/1000:8.1f} ms  '
+              f'gi: {"yes" if gi else "no"}{flag}')
+
+        # Most expensive direct imports
+        for cumul, name in sorted(children, reverse = True)[:TOP]:
+            print(f'    {name:<24} {cumul/1000:8.1f} ms')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  bench_transform.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+
+""" Cost per vertex of rotating the objects' points.
+    'per-vertex matrices' is how Sphere.rotate_point used to work: the
+    three matrices were built (six cos/sin calls) for every point. It is
+    kept here as the reference for the Transform measurements.
+
+        python3 bench_transform.py [points]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import povview_things
+from povview_things import Sphere
+from povview_transform import Transform
+
+REPEAT = 5
+POINTS = 20000
+SUBDIVS = (12, 25, 50)
+
+
+def per_vertex_matrices(point, center, rotation):
+    p = np.array([point[0], point[1], point[2]])
+    rx, ry, rz = rotation['x'], rotation['y'], rotation['z']
+    Rx = np.array([[1, 0, 0],
+                   [0, np.cos(rx), -np.sin(rx)],
+                   [0, np.sin(rx), np.cos(rx)]])
+    Ry = np.array([[np.cos(ry), 0, np.sin(ry)],
+                   [0, 1, 0],
+                   [-np.sin(ry), 0, np.cos(ry)]])
+    Rz = np.array([[np.cos(rz), -np.sin(rz), 0],
+                   [np.sin(rz), np.cos(rz), 0],
+                   [0, 0, 1]])
+    p = p - np.array(center)
+    p = Rx @ Ry @ Rz @ p
+    p = p + np.array(center)
+    return p.tolist()
+
+
+def best(function, n):
+    """ Best time of REPEAT runs of function(), in us per item (n items) """
+    times = []
+    for r in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) / n * 1e6
+
+
+def main(args):
+    n = int(args[1]) if len(args) > 1 else POINTS
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-100, 100, (n, 3))
+    point_list = points.tolist()
+    center = [1.0, 2.0, 3.0]
+    rotation = {'x': 0.3, 'y': 0.5, 'z': 0.7}
+    transform = Transform(dict(rotation))
+    sphere = Sphere(center, 10, wireframe = False)
+    sphere.rotation.update(rotation)
+
+    print(f'{"us per vertex":<36} {n} points')
+    for name, function in (
+            ('per-vertex matrices (before)',
+                lambda: [per_vertex_matrices(p, center, rotation)
+                            for p in point_list]),
+            ('Sphere.rotate_point',
+                lambda: [sphere.rotate_point(p) for p in point_list]),
+            ('Transform.apply, (N, 3) batch',
+                lambda: transform.apply(points, center))):
+        print(f'    {name:<32} {best(function, n):10.3f}')
+
+    print(f'{"Sphere.create_wireframe (uncached)":<36}')
+    for subdiv in SUBDIVS:
+        povview_things.SUBDIV = subdiv
+        vertices = (subdiv + 1)**2
+
+        def build():
+            povview_things.GEOMETRY_CACHE.clear()
+            sphere.create_wireframe()
+
+        us = best(build, vertices)
+        print(f'    SUBDIV {subdiv:<25} {us:10.3f}'
+              f'   ({us * vertices / 1000:.3f} ms per sphere)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
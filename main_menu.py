@@ -25,8 +25,7 @@
 
 import gi
 gi.require_version('Gtk', '3.0')
-gi.require_version('GooCanvas', '2.0')
-from gi.repository import Gtk, GooCanvas
+from gi.repository import Gtk
 
 """
  __  __       _
@@ -29,17 +29,49 @@
 
 import gi
 gi.require_version('Gtk', '3.0')
+gi.require_version('Gdk', '3.0')
 gi.require_version('GooCanvas', '2.0')
-from gi.repository import Gtk, GooCanvas
+from gi.repository import Gtk, Gdk, GooCanvas, GLib, Gio
 
 from main_menu import Main_menu
-from povview_things import Vec3, Cone, Sphere
-from pdb import set_trace as st
-from povview_parser import make_pov_parser
-import pyparsing as pp
+import povview_things
+from povview_things import Vec3, Cone, Sphere, RGB, Color_table
+from povview_timing import TIMER, timed
+from povview_scenegen import make_scene
+from povview_shm import build_wireframes, shutdown_pool
+from povview_history import History, compact, expand
+from povview_loader import Scene_loader
+from povview_binscene import Binary_scene, EXTENSION as BINARY_EXTENSION
+from math import pi
+import os
+import time
+
+# Not imported here, as they are not needed to start the viewer:
+#   povview_parser, pyparsing   when a file is opened (by the loader thread)
+#   povview_profile             when a profiling session is started
+#   povview_commands            when a command is entered
+#   povview_tiles, cairo        when the tile cache is enabled
 
 
 TEST_OBJ = [['sphere', [[0.0, 0.0, 0.0], 40]]]
+CMD_EXAMPLE = 'array 10x10 sphere <0, 0, 0> 20 rgb <0, 0, 1>; rotate sel y 30'
+
+PARALLEL_SPHERES = 500          # Minimum new spheres for worker processes
+
+RELOAD_DELAY = 100              # ms after a file change before reloading
+
+LAZY_LIMIT = 50000              # Objects built from a binary scene, at most
+LAZY_CHUNK = 100                # ... per idle call
+LAZY_SCAN = 20000               # Binary scene objects checked per idle call
+BOUNDS_PADDING = 10             # Around a binary scene on the canvases
+
+ZOOM_STEP = 1.25                # Scale factor per Ctrl+wheel step
+
+STYLE_CHUNK = 250               # Objects per canvas item, at most
+
+STRESS_OBJECTS = 200            # Objects loaded by the stress test
+STRESS_CONES = 0.2              # ... of which this fraction are cones
+STRESS_COLORS = 8               # ... with colors from a palette of this size
 
 COLORS = {'White':  (1, 1, 1),
           'Black':  (0, 0, 0),
@@ -57,6 +89,8 @@ class Views(Gtk.Grid):
         super().__init__(row_spacing = 4, column_spacing = 4, margin = 4)
 
         self.objs = []
+        self.items = []             # Parsed items, as loaded
+        self.item_objs = []         # Object per item (None if not drawn)
 
          # Store current rotation angles and sphere parameters
         self.current_rotation = {'x': 0, 'y': 0, 'z': 0}
@@ -77,21 +111,296 @@ class Views(Gtk.Grid):
             frame.add(self.canvas)
             self.views[lbl] = {'frame': frame, 'canvas': self.canvas}
 
+            # Repaint timing: the 'draw' handlers run before and after
+            # GooCanvas paints its items
+            self.canvas.connect('draw', self.on_canvas_draw_begin)
+            self.canvas.connect_after('draw', self.on_canvas_draw_end)
+            self.canvas.connect('size-allocate', self.on_canvas_size_allocate)
+
+            # Ctrl+wheel zooms, dragging pans
+            self.canvas.add_events(Gdk.EventMask.SCROLL_MASK |
+                                   Gdk.EventMask.BUTTON_PRESS_MASK |
+                                   Gdk.EventMask.BUTTON_RELEASE_MASK |
+                                   Gdk.EventMask.POINTER_MOTION_MASK)
+            self.canvas.connect('scroll-event', self.on_canvas_scroll)
+            self.canvas.connect('button-press-event', self.on_canvas_button_press)
+            self.canvas.connect('motion-notify-event', self.on_canvas_motion)
+            self.canvas.connect('button-release-event', self.on_canvas_button_release)
+
+        self.repaint_start = {}
+
+        self.history = History(self.apply_values)
+        self.sliders = {}           # key: (slider, handler id), see set_slider
+
+        # Objects are drawn grouped by color: per view, one canvas item
+        # holds the paths of up to STYLE_CHUNK objects of a color (see
+        # draw_objects). A chunk is (color index, number).
+        self.colors = Color_table()
+        self.chunks = {}            # chunk: {object: None}
+        self.open_chunks = {}       # color index: chunk new objects go to
+        self.chunk_count = 0
+        self.batches = {view: {} for view in self.views}
+
+        # Binary scenes: objects are built when they first come into view
+        self.binary = None          # The Binary_scene, if one is loaded
+        self.lazy_objs = {}         # (kind, index): object, while in view
+        self.lazy_deleted = set()   # Keys of deleted objects
+        self.lazy_edited = set()    # Keys of edited objects (kept built)
+        self.visible_source = None
+        self.visible_scan = None    # See update_visible
+
+        self.selection = {}         # Selected objects: {object: None}
+        self.batch = None           # Work deferred to end_batch
+
+        self.tiles = None           # {view: (Tile_cache, Tile_item)} if on
+        self.pan = None             # Drag in progress, see on_canvas_motion
+
     def add_object(self, obj):
 
         self.clear_all()
+        self.update_objects(obj)
+
+    def make_object(self, item):
+        """ Create the object for a parsed item, None if not drawable """
+        if 'pigment' in item:       # ... 'pigment', 'color', 'rgb', [r, g, b]
+            color = RGB(list(item[-1]))
+        else:
+            color = RGB(list(COLORS['Black']))
+
+        if item[0] == 'sphere':
+            # Here, we assume obj[1] is [position, radius] for the sphere
+            position = item[1][0]
+            self.current_position = position
+            radius = item[1][1]
+            self.current_size = radius
+            o = Sphere(position, radius, color, wireframe = False)
+
+        elif item[0] == 'cone':
+            o = Cone(item[1], color)
+
+        else:
+            return None
+
+        o.style = self.colors.intern(color)
+        return o
+
+    def update_objects(self, obj):
+        """ Compare the parsed items with the ones currently shown, by
+            position in the source, and rebuild and redraw only the objects
+            which were added, removed or modified.
+            The unchanged items at the start and at the end are skipped
+            first, so inserting or deleting a block does not shift the
+            comparison of everything after it.
+            Returns the number of items which changed.
+        """
+        items = [item.as_list() if hasattr(item, 'as_list') else item
+                    for item in obj]
+        old, old_objs = self.items, self.item_objs
+
+        n = min(len(old), len(items))
+        head = 0
+        while head < n and old[head] == items[head]:
+            head += 1
+        tail = 0
+        while (tail < n - head and
+                    old[len(old) - 1 - tail] == items[len(items) - 1 - tail]):
+            tail += 1
+
+        old_mid = range(head, len(old) - tail)
+        new_mid = range(head, len(items) - tail)
+        item_objs = old_objs[:head]
+        new_objs = []
+        changed = 0
+
+        for i in new_mid:
+            if i in old_mid and old[i] == items[i]:
+                item_objs.append(old_objs[i])
+                continue
+            o = self.make_object(items[i])
+            if o is not None:
+                new_objs.append(o)
+            item_objs.append(o)
+            changed += 1
+
+        self.build_wireframes([o for o in new_objs if isinstance(o, Sphere)])
+
+        removed_chunks = set()
+        for i in old_mid:
+            if not (i in new_mid and old[i] == items[i]):
+                if old_objs[i] is not None:
+                    removed_chunks.add(self.remove_object(old_objs[i]))
+                changed += i not in new_mid
+
+        item_objs += old_objs[len(old) - tail:]
+
+        self.items = items
+        self.item_objs = item_objs
+        self.objs = [o for o in item_objs if o is not None] + \
+                    list(self.lazy_objs.values())
+        povview_things.set_geometry_cache_spheres(len(self.spheres()))
+        self.draw_objects(new_objs, removed_chunks)
+
+        if changed:
+            # The recorded values do not apply to other objects
+            self.history.clear()
+        return changed
+
+    def begin_batch(self):
+        """ Until end_batch, wireframes and drawing are only recorded,
+            so objects changed several times are built and drawn once
+        """
+        self.batch = {'build': {}, 'draw': {}, 'chunks': set()}
+
+    def end_batch(self):
+        """ Build and draw what changed since begin_batch, and update
+            the items of the changed objects
+        """
+        batch, self.batch = self.batch, None
+        present = set(self.objs)
+        self.build_wireframes([s for s in batch['build'] if s in present])
+
+        objs = [o for o in batch['draw'] if o in present]
+        index = {o: i for i, o in enumerate(self.item_objs) if o is not None}
+        keys = {o: key for key, o in self.lazy_objs.items()}
+        for o in objs:
+            if o in index:
+                self.items[index[o]] = o.to_item()
+            elif o in keys:
+                # Not built again from the file, so it is not released
+                self.lazy_edited.add(keys[o])
+        self.draw_objects(objs, batch['chunks'])
+        return objs
+
+    @timed('draw_on')
+    def draw_objects(self, objs, chunks = ()):
+        """ Calculate the paths of objs, and update the canvas items of
+            their chunks (and those in 'chunks', e.g. of removed objects).
+            Each chunk of up to STYLE_CHUNK objects of a style costs one
+            canvas item per view, and only the changed chunks are joined
+            and set again.
+        """
+        if self.batch is not None:
+            self.batch['draw'].update(dict.fromkeys(objs))
+            self.batch['chunks'].update(chunks)
+            return
+
+        chunks = set(chunks)
+        for o in objs:
+            o.paths = {view: o.to_svg(view) for view in self.views}
+            chunk = getattr(o, 'chunk', None)
+            if o not in self.chunks.get(chunk, ()):
+                chunk = self.style_chunk(o.style)
+                self.chunks.setdefault(chunk, {})[o] = None
+                o.chunk = chunk
+            chunks.add(chunk)
+
+        if self.tiles is not None:
+            # Only the tiles under the changed objects are rendered again
+            for view, (cache, item) in self.tiles.items():
+                for o in objs:
+                    cache.update(o, o.paths[view], o.style)
+                item.changed(True)
+            return
+
+        for chunk in chunks:
+            members = self.chunks.get(chunk)
+            for view in self.views:
+                item = self.batches[view].get(chunk)
+                if not members:
+                    if item is not None:
+                        item.remove()
+                        del self.batches[view][chunk]
+                    continue
+
+                data = ''.join(o.paths[view] for o in members)
+                if item is None:
+                    root = self.views[view]['canvas'].get_root_item()
+                    self.batches[view][chunk] = GooCanvas.CanvasPath(
+                                parent = root,
+                                data = data,
+                                line_width = 1,
+                                stroke_color = self.colors.stroke(chunk[0]),
+                                fill_color = None)
+                else:
+                    item.set_property('data', data)
+
+            if not members:
+                self.chunks.pop(chunk, None)
+
+    def style_chunk(self, style):
+        """ The chunk of the style to add an object to """
+        chunk = self.open_chunks.get(style)
+        if chunk is None or len(self.chunks.get(chunk, ())) >= STYLE_CHUNK:
+            chunk = (style, self.chunk_count)
+            self.chunk_count += 1
+            self.open_chunks[style] = chunk
+        return chunk
+
+    def remove_object(self, o):
+        """ Take the object out of its chunk; returns the chunk, which
+            must be updated with draw_objects
+        """
+        chunk = getattr(o, 'chunk', None)
+        self.chunks.get(chunk, {}).pop(o, None)
+        self.selection.pop(o, None)
+        if self.tiles is not None:
+            for cache, item in self.tiles.values():
+                cache.remove(o)
+        return chunk
+
+    def set_tile_mode(self, on):
+        """ Show the views as cached raster tiles (see povview_tiles),
+            or as one canvas path per color
+        """
+        from povview_tiles import Tile_cache, Tile_item
+
+        if on == (self.tiles is not None):
+            return
+        if on:
+            self.tiles = {}
+            for view in self.views:
+                for item in self.batches[view].values():
+                    item.remove()
+                self.batches[view] = {}
+
+                cache = Tile_cache(self.colors)
+                for o in self.objs:
+                    cache.update(o, o.paths[view], o.style)
+                root = self.views[view]['canvas'].get_root_item()
+                self.tiles[view] = (cache, Tile_item(cache, parent = root))
+        else:
+            for cache, item in self.tiles.values():
+                item.remove()
+            self.tiles = None
+            self.draw_objects([], set(self.chunks))
+
+    def add_items(self, items):
+        """ Add objects for parsed items to the scene; returns them """
+        first = len(self.item_objs)
+        self.update_objects(self.items + list(items))
+        return [o for o in self.item_objs[first:] if o is not None]
+
+    def delete_objects(self, objs):
+        """ Remove objects from the scene """
+        objs = set(objs)
+
+        # Objects of a binary scene have no item. Their keys are kept,
+        # so update_visible does not build them again.
+        chunks = set()
+        for key, o in list(self.lazy_objs.items()):
+            if o in objs:
+                chunks.add(self.remove_object(o))
+                del self.lazy_objs[key]
+                self.lazy_deleted.add(key)
+                self.lazy_edited.discard(key)
+        if chunks:
+            self.objs = [o for o in self.objs if o not in objs]
+            self.draw_objects([], chunks)
+
+        self.update_objects([item for item, o in
+                                    zip(self.items, self.item_objs)
+                                    if o is None or o not in objs])
 
-        for item in obj:
-            if item[0] == 'sphere':
-                # Here, we assume obj[1] is [position, radius] for the sphere
-                position = item[1][0]
-                self.current_position = position
-                radius = item[1][1]
-                self.current_size = radius
-                s = Sphere(position, radius)
-                self.objs.append(s)
-                s.draw_on(self.views)
-    
     def clear(self):
         """
         Removes all items from all canvases in the views.
@@ -111,6 +420,13 @@ class Views(Gtk.Grid):
                     child = root.get_child(i)
                     if child:
                         root.remove_child(i)
+            self.batches[view_key] = {}
+
+            if self.tiles is not None:
+                from povview_tiles import Tile_item
+                cache = self.tiles[view_key][0]
+                cache.clear()
+                self.tiles[view_key] = (cache, Tile_item(cache, parent = root))
 
     def clear_all(self):
         """
@@ -119,25 +435,310 @@ class Views(Gtk.Grid):
         """
         self.clear()
         self.objs = []
+        self.items = []
+        self.item_objs = []
+        self.chunks = {}
+        self.open_chunks = {}
+        self.selection = {}
+        self.history.clear()
+
+        if self.binary is not None:
+            self.binary = None
+            self.lazy_objs = {}
+            self.lazy_deleted = set()
+            self.lazy_edited = set()
+            self.visible_scan = None
+            for view in self.views.values():
+                view['canvas'].set_property('automatic_bounds', True)
+
+    def load_binary(self, scene):
+        """ Show a Binary_scene. The canvas bounds are taken from the
+            scene's header, and only the objects in view are built, in
+            idle time (see update_visible), so this does not depend on the
+            scene's size.
+        """
+        self.clear_all()
+        self.binary = scene
+        lo, hi = scene.bounds
+        for view in self.views:
+            u, v, d = povview_things.VIEW_AXES[view]
+            canvas = self.views[view]['canvas']
+            canvas.set_property('automatic_bounds', False)
+            canvas.set_bounds(lo[u] - BOUNDS_PADDING, lo[v] - BOUNDS_PADDING,
+                              hi[u] + BOUNDS_PADDING, hi[v] + BOUNDS_PADDING)
+        self.schedule_visible()
+
+    def viewport_pixels(self, canvas):
+        """ The position of the visible part in the canvas window, in
+            pixels. convert_from_pixels (and the event coordinates) are
+            relative to the complete canvas window, which is scrolled by
+            the adjustment values.
+        """
+        return (canvas.get_hadjustment().get_value(),
+                canvas.get_vadjustment().get_value())
+
+    def visible_rect(self, view):
+        """ The part of the drawing shown by a view (canvas units) """
+        canvas = self.views[view]['canvas']
+        alloc = canvas.get_allocation()
+        x, y = self.viewport_pixels(canvas)
+        u0, v0 = canvas.convert_from_pixels(x, y)
+        u1, v1 = canvas.convert_from_pixels(x + alloc.width, y + alloc.height)
+        return u0, v0, u1, v1
+
+    def visible_keys(self):
+        """ Yields the (kind, index) of the binary scene's objects in view,
+            per view (so objects in several views more than once)
+        """
+        for view in self.views:
+            u, v, d = povview_things.VIEW_AXES[view]
+            yield from self.binary.visible(u, v, self.visible_rect(view))
+
+    def update_visible(self):
+        """ Scan the binary scene for objects in view, LAZY_SCAN objects
+            per call, and build and draw up to LAZY_CHUNK of them (up to
+            LAZY_LIMIT in total). When the scan is complete, the objects
+            which are no longer in view are released, unless selected or
+            edited. Returns True, to be called again when idle, until the
+            scan is complete.
+        """
+        if self.binary is None:
+            self.visible_source = None
+            return False
+
+        if self.visible_scan is None:
+            self.visible_scan = self.visible_keys()
+            self.visible_kept = set()
+            self.visible_skipped = 0
+
+        new_objs = []
+        done = True
+        for n, key in enumerate(self.visible_scan):
+            if key in self.lazy_objs:
+                self.visible_kept.add(key)
+            elif key in self.lazy_deleted:
+                pass
+            elif len(self.lazy_objs) >= LAZY_LIMIT:
+                self.visible_skipped += 1
+            else:
+                o = self.make_object(self.binary.item(*key))
+                self.lazy_objs[key] = o
+                self.visible_kept.add(key)
+                new_objs.append(o)
+
+            if len(new_objs) >= LAZY_CHUNK or n + 1 >= LAZY_SCAN:
+                done = False
+                break
+
+        chunks = ()
+        if done:
+            released = [key for key, o in self.lazy_objs.items()
+                            if key not in self.visible_kept and
+                                key not in self.lazy_edited and
+                                o not in self.selection]
+            gone = {self.lazy_objs.pop(key) for key in released}
+            if gone:
+                chunks = {self.remove_object(o) for o in gone}
+                self.objs = [o for o in self.objs if o not in gone]
+
+            if self.visible_skipped and released:
+                done = False        # There is room now: scan again
+            elif self.visible_skipped:
+                print(f'Binary scene: only {LAZY_LIMIT} of '
+                      f'{len(self.binary)} objects are shown')
+            self.visible_scan = None
+
+        self.build_wireframes([o for o in new_objs if isinstance(o, Sphere)])
+        self.objs += new_objs
+        self.draw_objects(new_objs, chunks)
+        if done:
+            povview_things.set_geometry_cache_spheres(len(self.spheres()))
+
+        if done:
+            self.visible_source = None
+        return not done
+
+    def on_canvas_size_allocate(self, canvas, allocation):
+        # Not while allocating: drawing adds canvas items
+        self.schedule_visible()
+
+    def schedule_visible(self):
+        """ (Re)start the scan of update_visible when idle, after the view
+            changed
+        """
+        if self.binary is None:
+            return
+        self.visible_scan = None
+        if self.visible_source is None:
+            self.visible_source = GLib.idle_add(self.update_visible)
+
+    def on_canvas_scroll(self, canvas, event):
+        if not event.state & Gdk.ModifierType.CONTROL_MASK:
+            return False
+        if event.direction == Gdk.ScrollDirection.UP:
+            factor = ZOOM_STEP
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            factor = 1 / ZOOM_STEP
+        else:
+            return False
+
+        # Keep the point under the pointer in place
+        x, y = canvas.convert_from_pixels(event.x, event.y)
+        left, top = self.viewport_pixels(canvas)
+        scale = canvas.get_scale() * factor
+        canvas.set_scale(scale)
+        canvas.scroll_to(x - (event.x - left) / scale,
+                         y - (event.y - top) / scale)
+        self.schedule_visible()
+        return True
+
+    def on_canvas_button_press(self, canvas, event):
+        if event.button in (1, 2):
+            # The root coordinates do not move with the canvas window
+            left, top = canvas.convert_from_pixels(*self.viewport_pixels(canvas))
+            self.pan = (canvas, event.x_root, event.y_root, left, top)
+        return False
+
+    def on_canvas_motion(self, canvas, event):
+        if self.pan is None or self.pan[0] is not canvas:
+            return False
+        canvas, x, y, left, top = self.pan
+        scale = canvas.get_scale()
+        canvas.scroll_to(left - (event.x_root - x) / scale,
+                         top - (event.y_root - y) / scale)
+        self.schedule_visible()
+        return True
+
+    def on_canvas_button_release(self, canvas, event):
+        self.pan = None
+        return False
     
+    def build_wireframes(self, spheres):
+        """ Calculate the wireframes of new spheres; many at once are
+            done by worker processes
+        """
+        if self.batch is not None:
+            self.batch['build'].update(dict.fromkeys(spheres))
+        elif len(spheres) >= PARALLEL_SPHERES:
+            build_wireframes(spheres, povview_things.SUBDIV)
+        else:
+            for s in spheres:
+                s.create_wireframe()
+
+    def redraw_all(self):
+        self.draw_objects(self.objs)
+
+    def spheres(self):
+        return [s for s in self.objs if isinstance(s, Sphere)]
+
+    def current_values(self, key):
+        """ The (compacted) value of a parameter, for the history """
+        if key == 'subdiv':
+            return povview_things.SUBDIV
+        elif key == 'size':
+            return compact(s.radius for s in self.spheres())
+        else:       # ('rotation', axis)
+            return compact(s.rotation[key[1]] for s in self.spheres())
+
     # Callback for subdivision slider
     def on_subdiv_change(self, slider):
         sliderValue = slider.get_value()
-        for s in self.objs:
-            s.update_sphere_subdivision(sliderValue, self.views)
+        old = self.current_values('subdiv')
+        self.set_subdivision(sliderValue)
+        self.history.record('subdiv', old, self.current_values('subdiv'))
+
+    def set_subdivision(self, value):
+        """ Change the (global) subdivision, and rebuild all the objects:
+            cones as well as spheres depend on it
+        """
+        povview_things.SUBDIV = int(value)
+        self.build_wireframes(self.spheres())
+        for o in self.objs:
+            if isinstance(o, Cone):
+                o.create_wireframe()
+        self.draw_objects(self.objs)
 
     # Callback for size slider
     def on_size_change(self, slider):
         sliderValue = slider.get_value()
-        for s in self.objs:
-            s.update_sphere_size(sliderValue, self.views)
+        old = self.current_values('size')
+        spheres = self.spheres()
+        for s in spheres:
+            s.update_sphere_size(sliderValue)
+        self.draw_objects(spheres)
+        self.current_size = sliderValue
+        self.history.record('size', old, self.current_values('size'))
 
     def on_rotation_change(self, slider, axis):
         angle = slider.get_value()
-        for s in self.objs:
-            if isinstance(s, Sphere):
-                s.update_rotation(axis, angle, self.views)
+        old = self.current_values(('rotation', axis))
+        spheres = self.spheres()
+        for s in spheres:
+            s.update_rotation(axis, angle)
+        self.draw_objects(spheres)
+        self.current_rotation[axis] = angle
+        self.history.record(('rotation', axis), old,
+                            self.current_values(('rotation', axis)))
+
+    def apply_values(self, key, value):
+        """ Restore a parameter from the history. Only the spheres whose
+            value differs are recalculated (often from the geometry cache).
+        """
+        spheres = self.spheres()
+        if key == 'subdiv':
+            self.set_subdivision(value)
+            self.set_slider('subdiv', value)
+            return
+
+        values = expand(value, len(spheres))
+        if len(values) != len(spheres):
+            return                  # The scene changed; cannot be applied
+
+        changed = []
+        for s, v in zip(spheres, values):
+            if key == 'size':
+                if s.radius != v:
+                    s.update_sphere_size(v)
+                    changed.append(s)
+            elif s.rotation[key[1]] != v:
+                s.rotation[key[1]] = v
+                s.create_wireframe()
+                changed.append(s)
+        self.draw_objects(changed)
+
+        if isinstance(value, tuple):
+            return                  # No single slider position
+        if key == 'size':
+            self.current_size = value
+            self.set_slider('size', value)
+        else:
+            self.current_rotation[key[1]] = value * 180 / pi
+            self.set_slider(key, value * 180 / pi)
 
+    def set_slider(self, key, value):
+        """ Move a slider without calling its handler """
+        if key in self.sliders:
+            slider, handler = self.sliders[key]
+            slider.handler_block(handler)
+            slider.set_value(value)
+            slider.handler_unblock(handler)
+
+    def undo(self):
+        return self.history.undo()
+
+    def redo(self):
+        return self.history.redo()
+
+    def on_canvas_draw_begin(self, canvas, cr):
+        if TIMER.enabled:
+            self.repaint_start[canvas] = time.perf_counter()
+        return False
+
+    def on_canvas_draw_end(self, canvas, cr):
+        start = self.repaint_start.pop(canvas, None)
+        if start is not None:
+            TIMER.add('repaint', start, time.perf_counter())
+        return False
 
 
         
@@ -146,27 +747,41 @@ class MainWindow(Gtk.Window):
     def __init__(self):
         super(MainWindow, self).__init__()
         self.connect("destroy", lambda x: Gtk.main_quit())
+        self.connect("key-press-event", self.on_key_press)
         self.set_default_size(800, 600)
 
         mm = self.make_main_menu()
 
-        cmd_entry = Gtk.Entry(text = TEST_OBJ, hexpand = True)
+        cmd_entry = Gtk.Entry(hexpand = True,
+                    placeholder_text = 'Commands, e.g. ' + CMD_EXAMPLE)
         cmd_entry.connect('activate', self.on_cmd_entry_activate)
 
         self.views = Views()
+        self.profile = None
+
+        self.pov_filename = None
+        self.block_cache = {}       # Parsed blocks of the current file
+        self.monitor = None         # Set while watching the file
+        self.reload_source = None
+        self.loader = None          # Set while a file is being loaded
+        self.timing_overlay = False
+        self.timing_source = None   # Overlay update timeout, while shown
+        self.stress_running = False
 
         # Create sliders for subdivision, rotation, and size
         self.subdiv_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL)
         self.subdiv_slider.set_range(3, 50)  # Min 3 subdivisions, max 50
         self.subdiv_slider.set_value(25)  # Default
         subdiv_slider_value = self.subdiv_slider.get_value()
-        self.subdiv_slider.connect('value-changed', self.views.on_subdiv_change)
+        handler = self.subdiv_slider.connect('value-changed', self.views.on_subdiv_change)
+        self.views.sliders['subdiv'] = (self.subdiv_slider, handler)
 
         self.size_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL)
         self.size_slider.set_range(10, 200)  # Adjust the range as needed
         self.size_slider.set_value(50)  # Default
         size_slider_value = self.size_slider.get_value()
-        self.size_slider.connect('value-changed', self.views.on_size_change)
+        handler = self.size_slider.connect('value-changed', self.views.on_size_change)
+        self.views.sliders['size'] = (self.size_slider, handler)
 
         # Rotation sliders
         self.rotation_sliders = {}
@@ -174,8 +789,9 @@ class MainWindow(Gtk.Window):
             slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL)
             slider.set_range(0, 360)
             slider.set_value(0)
-            slider.connect('value-changed', lambda w, a=axis: self.views.on_rotation_change(w, a))
+            handler = slider.connect('value-changed', lambda w, a=axis: self.views.on_rotation_change(w, a))
             self.rotation_sliders[axis] = slider
+            self.views.sliders[('rotation', axis)] = (slider, handler)
 
         grid = Gtk.Grid(vexpand = True)
         grid.attach(mm, 0, 0, 2, 1)
@@ -199,31 +815,149 @@ class MainWindow(Gtk.Window):
         grid.attach(Gtk.Label("Rotate Z"), 0, 7, 1, 1)
         grid.attach(self.rotation_sliders['z'], 1, 7, 1, 1)
 
+        # Timing overlay (hidden until enabled from the Tests menu)
+        self.timing_label = Gtk.Label(xalign = 0, selectable = True)
+        self.timing_label.set_no_show_all(True)
+        grid.attach(self.timing_label, 0, 8, 2, 1)
+
+        # Load progress (shown while a file is loaded)
+        self.load_progress = Gtk.ProgressBar(show_text = True, hexpand = True,
+                                             valign = Gtk.Align.CENTER)
+        cancel_button = Gtk.Button(label = 'Cancel')
+        cancel_button.connect('clicked', self.on_load_cancel_clicked)
+        self.load_box = Gtk.Box(spacing = 4, margin = 4)
+        self.load_box.pack_start(self.load_progress, True, True, 0)
+        self.load_box.pack_start(cancel_button, False, False, 0)
+        self.load_box.show_all()
+        self.load_box.set_no_show_all(True)
+        self.load_box.hide()
+        grid.attach(self.load_box, 0, 9, 2, 1)
+
         self.add(grid)
         self.show_all()
 
 
     def run(self):
         Gtk.main()
+        shutdown_pool()
 
     def make_main_menu(self):
-        mm = Main_menu(['_File', '_Tests', '_Help'])
+        mm = Main_menu(['_File', '_Edit', '_View', '_Tests', '_Help'])
         mm.add_items_to('_File', (
                     ('Open POV scene...', self.on_open_pov_clicked),
+                    ('Watch scene file for changes', self.on_watch_file_clicked),
                     (None, None),
                     ('_Quit', self.on_quit_clicked)))
 
+        mm.add_items_to('_Edit', (
+                    ('_Undo (Ctrl+Z)', self.on_undo_clicked),
+                    ('_Redo (Ctrl+Y)', self.on_redo_clicked)))
+
+        mm.add_items_to('_View', (
+                    ('Show/hide back faces', self.on_backfaces_clicked),
+                    ('Lines/Bézier curves', self.on_bezier_clicked),
+                    (None, None),
+                    ('Raster tile cache on/off', self.on_tiles_clicked)))
+
         mm.add_items_to('_Tests', (
-                    ('Add Sphere to viewer', self.on_add_sphere_clicked), ))
+                    ('Add Sphere to viewer', self.on_add_sphere_clicked),
+                    (f'Stress test ({STRESS_OBJECTS} objects)',
+                                    self.on_stress_test_clicked),
+                    (None, None),
+                    ('Show/hide timing overlay', self.on_timing_overlay_clicked),
+                    ('Export timing trace...', self.on_export_trace_clicked),
+                    (None, None),
+                    ('Start profiling', self.on_start_profiling_clicked),
+                    ('Stop profiling', self.on_stop_profiling_clicked)))
 
         return mm
 
 
 
+    def on_undo_clicked(self, menuitem):
+        self.views.undo()
+
+
+    def on_redo_clicked(self, menuitem):
+        self.views.redo()
+
+
+    def on_key_press(self, widget, event):
+        if event.state & Gdk.ModifierType.CONTROL_MASK:
+            key = Gdk.keyval_name(event.keyval)
+            if key in ('z', 'Z') and event.state & Gdk.ModifierType.SHIFT_MASK:
+                return self.views.redo()
+            elif key == 'z':
+                return self.views.undo()
+            elif key in ('y', 'Y'):
+                return self.views.redo()
+        return False
+
+
+    def on_backfaces_clicked(self, menuitem):
+        povview_things.HIDE_BACKFACES = not povview_things.HIDE_BACKFACES
+        self.views.redraw_all()
+
+
+    def on_bezier_clicked(self, menuitem):
+        povview_things.BEZIER_CURVES = not povview_things.BEZIER_CURVES
+        self.views.redraw_all()
+
+
+    def on_tiles_clicked(self, menuitem):
+        self.views.set_tile_mode(self.views.tiles is None)
+
+
     def on_add_sphere_clicked(self, menuitem):
         self.views.add_object(TEST_OBJ)
 
 
+    def on_stress_test_clicked(self, menuitem):
+        """ Load a synthetic scene and replay a fixed slider sweep. Each
+            step is timed as a 'frame', from setting the slider until the
+            main loop is idle again (i.e. after the repaint).
+        """
+        n_cones = int(STRESS_OBJECTS * STRESS_CONES)
+        self.views.add_object(make_scene(STRESS_OBJECTS - n_cones, n_cones,
+                                         layout = 'grid', seed = 1,
+                                         n_colors = STRESS_COLORS))
+
+        steps = []
+        for v in (5, 10, 15, 20, 25):
+            steps.append((self.subdiv_slider, v))
+        for v in (20, 50, 100, 150, 50):
+            steps.append((self.size_slider, v))
+        for axis in ['x', 'y', 'z']:
+            for v in range(0, 181, 30):
+                steps.append((self.rotation_sliders[axis], v))
+
+        self.stress_steps = steps
+        self.stress_frame_start = None
+        self.stress_running = True
+        TIMER.enabled = True
+        TIMER.reset()
+        GLib.idle_add(self.stress_step)
+
+
+    def stress_step(self):
+        # Idle callbacks run after the (higher priority) repaints
+        now = time.perf_counter()
+        if self.stress_frame_start is not None:
+            TIMER.add('frame', self.stress_frame_start, now)
+
+        if not self.stress_steps:
+            print(f'Stress test: {len(self.views.objs)} objects')
+            print(TIMER.summary())
+            self.stress_running = False
+            TIMER.enabled = self.timing_overlay
+            return False
+
+        slider, value = self.stress_steps.pop(0)
+        self.stress_frame_start = time.perf_counter()
+        slider.set_value(value)
+        return True
+
+
     def on_open_pov_clicked(self, menuitem):
         fc = Gtk.FileChooserDialog(
                     action = Gtk.FileChooserAction.OPEN)
@@ -233,43 +967,288 @@ class MainWindow(Gtk.Window):
 
         for f_name, f_pattern in (
                     ('POVday files (*.pov)', '*.pov'),
+                    (f'Binary scenes (*{BINARY_EXTENSION})',
+                                    '*' + BINARY_EXTENSION),
                     ('All files (*)', '*')):
             filter = Gtk.FileFilter()
             filter.set_name(f_name)
             filter.add_pattern(f_pattern)
             fc.add_filter(filter)
 
+        pov_filename = None
         if fc.run() == Gtk.ResponseType.ACCEPT:
-            print(fc.get_filename())
             pov_filename = fc.get_filename()
+        fc.destroy()
 
-            # Read the contents of the selected POV file
-            with open(pov_filename, 'r') as pov_file:
-                pov_content = pov_file.read()
-
-            # Parse the contents of the POV file using your parser
-            parser = make_pov_parser()
-            try:
-                parsed_data = parser.parseString(pov_content)
-                print("Parsed Data:", parsed_data)
-
-            except pp.ParseException as err:
-                print("Error parsing the POV file:")
-                print(err.line)
-                print(" " * (err.column - 1) + "^")
-                print(err)
-        
-        self.views.add_object(parsed_data)
+        if pov_filename is None:
+            return
+        if pov_filename.endswith(BINARY_EXTENSION):
+            self.load_binary_file(pov_filename)
+        else:
+            self.load_pov_file(pov_filename)
+
+
+    def load_binary_file(self, fname):
+        """ Binary scenes are mapped, not read: no need for the loader """
+        try:
+            scene = Binary_scene(fname)
+        except (OSError, ValueError) as err:
+            print(err)
+            self.show_load_error(fname, err)
+            return
+
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+            self.load_box.hide()
+        if self.monitor is not None:
+            self.monitor.cancel()
+            self.monitor = None
+        self.pov_filename = None
+        self.block_cache = {}
+        self.views.load_binary(scene)
+        print(f'Opened {fname}: {scene.counts}')
+
+
+    def load_pov_file(self, fname):
+        """ Read and parse the file in the background. The current scene
+            stays until the new one is complete, and is kept if loading
+            fails or is cancelled.
+        """
+        if self.loader is not None:
+            self.loader.cancel()
+        self.loader = Scene_loader(fname, self.block_cache,
+                                   self.on_load_progress,
+                                   self.on_load_done,
+                                   self.on_load_error,
+                                   call = GLib.idle_add).start()
+        self.load_progress.set_fraction(0)
+        self.load_progress.set_text(f'Opening {os.path.basename(fname)}')
+        self.load_box.show()
+
+
+    def on_load_progress(self, loader, stage, done, total, items):
+        if loader is self.loader:
+            self.load_progress.set_fraction(done / total if total else 1)
+            if stage == 'read':
+                text = f'Reading: {done/1024:.0f} of {total/1024:.0f} kB'
+            else:
+                text = (f'Parsing: {done/1024:.0f} of {total/1024:.0f} kB, '
+                        f'{items} objects')
+            self.load_progress.set_text(text)
+        return False
+
+
+    def on_load_done(self, loader, items, cache):
+        if loader is not self.loader:
+            return False
+        self.loader = None
+        self.load_box.hide()
+
+        self.block_cache = cache
+        self.pov_filename = loader.fname
+        if self.monitor is not None:
+            self.watch_file(loader.fname)
+        self.views.add_object(items)
+        print(f'Loaded {loader.fname}: {len(items)} items')
+        return False
+
+
+    def on_load_error(self, loader, err):
+        import pyparsing as pp
+
+        if loader is not self.loader:
+            return False
+        self.loader = None
+        self.load_box.hide()
+
+        if isinstance(err, pp.ParseException):
+            print("Error parsing the POV file:")
+            print(err.line)
+            print(" " * (err.column - 1) + "^")
+        print(err)
+        self.show_load_error(loader.fname, err)
+        return False
+
+
+    def show_load_error(self, fname, err):
+        dialog = Gtk.MessageDialog(
+                    transient_for = self,
+                    message_type = Gtk.MessageType.ERROR,
+                    buttons = Gtk.ButtonsType.CLOSE,
+                    text = f'Could not load {os.path.basename(fname)}')
+        dialog.format_secondary_text(str(err))
+        dialog.run()
+        dialog.destroy()
+
+
+    def on_load_cancel_clicked(self, button):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+        self.load_box.hide()
+
+
+    def on_watch_file_clicked(self, menuitem):
+        if self.monitor is not None:
+            self.monitor.cancel()
+            self.monitor = None
+            print('Stopped watching', self.pov_filename)
+
+        elif self.pov_filename is None:
+            print('No scene file opened')
+
+        else:
+            self.watch_file(self.pov_filename)
+            print('Watching', self.pov_filename)
+
+
+    def watch_file(self, fname):
+        if self.monitor is not None:
+            self.monitor.cancel()
+        self.monitor = Gio.File.new_for_path(fname).monitor_file(
+                    Gio.FileMonitorFlags.NONE, None)
+        self.monitor.connect('changed', self.on_pov_file_changed)
+
+
+    def on_pov_file_changed(self, monitor, gfile, other_file, event):
+        # Editors either rewrite the file, or replace it (a new file
+        # is 'created'). Changes arriving together cause one reload.
+        if event in (Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                     Gio.FileMonitorEvent.CREATED):
+            if self.reload_source is None:
+                self.reload_source = GLib.timeout_add(
+                            RELOAD_DELAY, self.reload_pov_file)
+
+
+    def reload_pov_file(self):
+        """ Parse only the blocks which changed (in the loader thread, see
+            on_reload_done), and update only the objects which changed
+        """
+        if self.loader is not None:
+            return True             # Loading: try again after RELOAD_DELAY
+
+        self.reload_source = None
+        if self.pov_filename is None:
+            return False            # A binary scene was opened meanwhile
+        self.reload_start = time.perf_counter()
+        self.loader = Scene_loader(self.pov_filename, self.block_cache,
+                                   self.on_load_progress,
+                                   self.on_reload_done,
+                                   self.on_reload_error,
+                                   call = GLib.idle_add).start()
+        return False
+
+
+    def on_reload_done(self, loader, items, cache):
+        if loader is not self.loader:
+            return False
+        self.loader = None
+
+        self.block_cache = cache
+        changed = self.views.update_objects(items)
+        print(f'Reloaded {loader.fname}: {changed} of {len(items)} '
+              f'items changed '
+              f'({(time.perf_counter() - self.reload_start)*1e3:.1f} ms)')
+        return False
+
+
+    def on_reload_error(self, loader, err):
+        if loader is not self.loader:
+            return False
+        self.loader = None
+        print('Scene not reloaded:', err)
+        return False
+
+
+    def on_timing_overlay_clicked(self, menuitem):
+        # The stress test enables the timer too, so it does not tell
+        # whether the overlay is shown
+        self.timing_overlay = not self.timing_overlay
+        if self.timing_overlay:
+            if not self.stress_running:
+                TIMER.reset()
+            TIMER.enabled = True
+            self.timing_label.show()
+            self.update_timing_overlay()
+            self.timing_source = GLib.timeout_add(500, self.update_timing_overlay)
+        else:
+            if self.timing_source is not None:
+                GLib.source_remove(self.timing_source)
+                self.timing_source = None
+            self.timing_label.hide()
+            TIMER.enabled = self.stress_running
+
+
+    def update_timing_overlay(self):
+        self.timing_label.set_markup(
+                    '<tt>' + GLib.markup_escape_text(TIMER.summary()) + '</tt>')
+        return True
+
+
+    def on_export_trace_clicked(self, menuitem):
+        fc = Gtk.FileChooserDialog(
+                    action = Gtk.FileChooserAction.SAVE,
+                    do_overwrite_confirmation = True)
+        fc.add_buttons(
+                    'Cancel', Gtk.ResponseType.CANCEL,
+                    'Save', Gtk.ResponseType.ACCEPT)
+        fc.set_current_name('povview_trace.json')
+
+        if fc.run() == Gtk.ResponseType.ACCEPT:
+            TIMER.export_chrome_trace(fc.get_filename())
+            print('Trace written to', fc.get_filename())
 
         fc.destroy()
 
 
+    def on_start_profiling_clicked(self, menuitem):
+        if self.profile is None:
+            from povview_profile import Profile_session
+            self.profile = Profile_session()
+
+        if self.profile.running:
+            print('Profiling session already running')
+            return
+        self.profile.start()
+        print('Profiling started')
+
+
+    def on_stop_profiling_clicked(self, menuitem):
+        files = self.profile.stop() if self.profile else None
+        if files is None:
+            print('No profiling session running')
+            return
+        print('Profiling stopped, written: {}, {}'.format(*files))
+
+
     def on_quit_clicked(self, menuitem):
         Gtk.main_quit()
 
 
     def on_cmd_entry_activate(self, entry):
-        print('Command: ', entry.get_text())
+        import pyparsing as pp
+        from povview_commands import run_commands
+
+        text = entry.get_text()
+        t_start = time.perf_counter()
+        try:
+            messages = run_commands(self.views, text)
+
+        except pp.ParseException as err:
+            print(err.line)
+            print(" " * (err.column - 1) + "^")
+            print(err)
+            entry.grab_focus()
+            entry.set_position(err.column - 1)
+            return
+
+        except ValueError as err:
+            print(err)
+            return
+
+        print(f'{text}: {", ".join(messages)} '
+              f'({(time.perf_counter() - t_start)*1e3:.1f} ms)')
 
 
 
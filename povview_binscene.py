@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_binscene.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+
+""" Binary scene files (.pvb), for scenes too large for .pov text.
+    The file is a header followed by typed arrays, each starting at a
+    multiple of ALIGN bytes, all little endian:
+
+        header              see HEADER (64 bytes)
+        sphere_centers      n_spheres x 3   float64
+        sphere_radii        n_spheres       float64
+        sphere_colors       n_spheres x 3   float32     rgb
+        cone_params         n_cones x 8     float64     top x, y, z, top
+                                                        radius, bottom x,
+                                                        y, z, bottom radius
+        cone_colors         n_cones x 3     float32
+        light_positions     n_lights x 3    float64
+        light_colors        n_lights x 3    float32
+
+    The header also holds the bounds of the drawn geometry (as drawn:
+    cones have their y axis flipped), so a viewer can set up its canvases
+    without reading the arrays. Binary_scene maps the arrays with
+    np.memmap: opening takes the same time for any size, and only the
+    pages which are used are read.
+
+        python3 povview_binscene.py scene.pov [scene.pvb]
+
+    converts a .pov file.
+"""
+
+import os
+
+import numpy as np
+
+MAGIC = b'POVVSCNE'
+VERSION = 1
+ALIGN = 64                      # Byte alignment of the arrays
+CHUNK = 1 << 16                 # Rows per step when scanning the arrays
+EXTENSION = '.pvb'
+
+HEADER = np.dtype([('magic', 'S8'),
+                   ('version', '<u4'),
+                   ('flags', '<u4'),
+                   ('n_spheres', '<u8'),
+                   ('n_cones', '<u8'),
+                   ('n_lights', '<u8'),
+                   ('bounds', '<f4', (2, 3))])      # min, max (x, y, z)
+
+# name, count (header field), dtype, columns
+ARRAYS = [('sphere_centers', 'n_spheres', '<f8', 3),
+          ('sphere_radii', 'n_spheres', '<f8', None),
+          ('sphere_colors', 'n_spheres', '<f4', 3),
+          ('cone_params', 'n_cones', '<f8', 8),
+          ('cone_colors', 'n_cones', '<f4', 3),
+          ('light_positions', 'n_lights', '<f8', 3),
+          ('light_colors', 'n_lights', '<f4', 3)]
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def layout(counts):
+    """ (name, offset, dtype, shape) of each array, and the file size,
+        for the counts {'n_spheres': n, ...}
+    """
+    arrays = []
+    offset = _aligned(HEADER.itemsize)
+    for name, count, dtype, columns in ARRAYS:
+        shape = (counts[count],) if columns is None else (counts[count], columns)
+        arrays.append((name, offset, np.dtype(dtype), shape))
+        offset = _aligned(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return arrays, offset
+
+
+def sphere_boxes(centers, radii):
+    """ Bounding boxes (min, max, each n x 3) of spheres, as drawn """
+    r = np.asarray(radii)[:, None]
+    return centers - r, centers + r
+
+
+def cone_boxes(params):
+    """ Bounding boxes (min, max, each n x 3) of cones, as drawn """
+    flip = np.array([1, -1, 1])
+    top = params[:, 0:3] * flip
+    bottom = params[:, 4:7] * flip
+    r = np.maximum(params[:, 3], params[:, 7])[:, None]
+    return (np.minimum(top, bottom) - r, np.maximum(top, bottom) + r)
+
+
+def write_arrays(fname, spheres = None, cones = None, lights = None):
+    """ Write a binary scene from arrays:
+            spheres     (centers (n, 3), radii (n,), colors (n, 3))
+            cones       (params (n, 8), colors (n, 3))
+            lights      (positions (n, 3), colors (n, 3))
+    """
+    centers, radii, sphere_colors = spheres or (np.empty((0, 3)),
+                                                np.empty(0), np.empty((0, 3)))
+    params, cone_colors = cones or (np.empty((0, 8)), np.empty((0, 3)))
+    positions, light_colors = lights or (np.empty((0, 3)), np.empty((0, 3)))
+    data = {'sphere_centers': centers, 'sphere_radii': radii,
+            'sphere_colors': sphere_colors,
+            'cone_params': params, 'cone_colors': cone_colors,
+            'light_positions': positions, 'light_colors': light_colors}
+
+    counts = {'n_spheres': len(centers), 'n_cones': len(params),
+              'n_lights': len(positions)}
+    arrays, size = layout(counts)
+
+    boxes = [b for b in (sphere_boxes(np.asarray(centers, float), radii),
+                         cone_boxes(np.asarray(params, float)))
+                if len(b[0])]
+    header = np.zeros(1, dtype = HEADER)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    for field, n in counts.items():
+        header[field] = n
+    if boxes:
+        header['bounds'][0, 0] = np.min([lo.min(axis = 0) for lo, hi in boxes],
+                                        axis = 0)
+        header['bounds'][0, 1] = np.max([hi.max(axis = 0) for lo, hi in boxes],
+                                        axis = 0)
+
+    with open(fname, 'wb') as f:
+        f.write(header.tobytes())
+        for name, offset, dtype, shape in arrays:
+            f.seek(offset)
+            f.write(np.ascontiguousarray(data[name], dtype = dtype)
+                        .reshape(shape).tobytes())
+        f.truncate(size)
+
+
+def write_scene(fname, items):
+    """ Write parsed items (the parser's format, see povview_parser) as a
+        binary scene. Objects without a pigment are black.
+    """
+    spheres, cones, lights = ([], [], []), ([], []), ([], [])
+    for item in items:
+        color = list(item[-1]) if 'pigment' in item else [0.0, 0.0, 0.0]
+        if item[0] == 'sphere':
+            spheres[0].append(item[1][0])
+            spheres[1].append(item[1][1])
+            spheres[2].append(color)
+        elif item[0] == 'cone':
+            top, tr, bottom, br = item[1]
+            cones[0].append(list(top) + [tr] + list(bottom) + [br])
+            cones[1].append(color)
+        elif item[0] == 'light_source':
+            lights[0].append(item[2])
+            lights[1].append(item[5])
+
+    write_arrays(fname,
+                 [np.array(a, float).reshape(-1, *s) for a, s in
+                        zip(spheres, ((3,), (), (3,)))],
+                 [np.array(a, float).reshape(-1, *s) for a, s in
+                        zip(cones, ((8,), (3,)))],
+                 [np.array(a, float).reshape(-1, 3) for a in lights])
+
+
+class Binary_scene:
+    """ A binary scene file, with its arrays memory mapped (read only).
+        The arrays are attributes with the names in ARRAYS. Raises
+        ValueError if the file is not a binary scene.
+    """
+    def __init__(self, fname):
+        self.fname = fname
+        size = os.path.getsize(fname)
+        if size < HEADER.itemsize:
+            raise ValueError(f'{fname}: not a binary scene (too short)')
+
+        header = np.fromfile(fname, dtype = HEADER, count = 1)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(f'{fname}: not a binary scene')
+        if header['version'] != VERSION:
+            raise ValueError(f'{fname}: unsupported version '
+                             f'{header["version"]}')
+
+        self.counts = {field: int(header[field])
+                            for field in ('n_spheres', 'n_cones', 'n_lights')}
+        self.bounds = np.array(header['bounds'], float)
+        arrays, end = layout(self.counts)
+        if size < end:
+            raise ValueError(f'{fname}: truncated ({size} of {end} bytes)')
+
+        for name, offset, dtype, shape in arrays:
+            if shape[0] == 0:       # np.memmap cannot map 0 bytes
+                array = np.empty(shape, dtype = dtype)
+            else:
+                array = np.memmap(fname, dtype = dtype, mode = 'r',
+                                  offset = offset, shape = shape)
+            setattr(self, name, array)
+
+
+    def __len__(self):
+        return self.counts['n_spheres'] + self.counts['n_cones']
+
+
+    def item(self, kind, i):
+        """ Object i of a kind ('sphere', 'cone' or 'light_source') in
+            the parser's format
+        """
+        if kind == 'sphere':
+            return ['sphere', [self.sphere_centers[i].tolist(),
+                               float(self.sphere_radii[i])],
+                    'pigment', 'color', 'rgb', self.sphere_colors[i].tolist()]
+        elif kind == 'cone':
+            p = self.cone_params[i].tolist()
+            return ['cone', [p[0:3], p[3], p[4:7], p[7]],
+                    'pigment', 'color', 'rgb', self.cone_colors[i].tolist()]
+        else:
+            return ['light_source', '{', self.light_positions[i].tolist(),
+                    'color', 'rgb', self.light_colors[i].tolist(), '}']
+
+
+    def visible(self, u, v, rect):
+        """ Yields (kind, index) of the objects whose bounding box, on the
+            drawing axes u and v, overlaps rect (u0, v0, u1, v1). The
+            arrays are scanned CHUNK rows at a time.
+        """
+        u0, v0, u1, v1 = rect
+        sources = (('sphere', self.counts['n_spheres'],
+                    lambda a, b: sphere_boxes(self.sphere_centers[a:b],
+                                              self.sphere_radii[a:b])),
+                   ('cone', self.counts['n_cones'],
+                    lambda a, b: cone_boxes(self.cone_params[a:b])))
+
+        for kind, n, boxes in sources:
+            for first in range(0, n, CHUNK):
+                lo, hi = boxes(first, min(first + CHUNK, n))
+                inside = ((hi[:, u] >= u0) & (lo[:, u] <= u1) &
+                          (hi[:, v] >= v0) & (lo[:, v] <= v1))
+                for i in np.flatnonzero(inside):
+                    yield kind, first + int(i)
+
+
+def main(args):
+    if len(args) < 2:
+        print(__doc__)
+        return 1
+
+    from povview_parser import parse_blocks
+
+    with open(args[1], 'r') as pov_file:
+        items = parse_blocks(pov_file.read())
+    out = args[2] if len(args) > 2 else os.path.splitext(args[1])[0] + EXTENSION
+    write_scene(out, items)
+    print(f'{out}: {Binary_scene(out).counts}')
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main(sys.argv))
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_commands.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+
+""" The command entry's scene editing language. Several commands can be
+    given at once, separated by ';':
+
+        add sphere <x, y, z> r [rgb <r, g, b>]
+        add cone <x, y, z> r <x, y, z> r [rgb <r, g, b>]
+        array NxM[xK] sphere|cone ... [rgb <r, g, b>] [step d]
+                                    copies spaced d (default ARRAY_SPACING
+                                    times the largest radius) along x, y, z
+        select all|none|spheres|cones
+        select i[-j]                objects by their index (0 is the first)
+        select inside <x, y, z> <x, y, z>
+                                    objects whose center is in the box
+        scale all|sel f             positions and sizes, around the origin
+        move all|sel <dx, dy, dz>
+        rotate all|sel x|y|z angle  objects around their centers, in
+                                    degrees (as the rotation sliders)
+        delete all|sel
+
+    'add' and 'array' select the objects they create, so e.g.
+    'array 10x10 sphere <0, 0, 0> 5; scale sel 2' scales the new spheres.
+    All the commands of a line are one batch (see Views.begin_batch): the
+    changed objects are calculated together, and drawn once at the end.
+"""
+
+from math import pi
+
+import numpy as np
+
+from povview_things import Sphere, Cone
+
+ARRAY_SPACING = 3               # Default array step, in (largest) radii
+MAX_ARRAY = 1000000             # Objects per array command, at most
+
+_parser = None
+
+
+def parse_commands(text):
+    """ The commands in text, as lists. Raises pp.ParseException. """
+    global _parser
+    if _parser is None:
+        from povview_parser import make_pov_parser
+        _parser = make_pov_parser('commands')
+    return _parser.parse_string(text, parse_all = True).as_list()
+
+
+def options(args):
+    """ The optional 'keyword value' pairs at the end of a command """
+    return {args[i]: args[i + 1] for i in range(0, len(args) - 1, 2)}
+
+
+def shape_item(shape, rgb):
+    item = [shape[0], shape[1]]
+    if rgb is not None:
+        item += ['pigment', 'color', 'rgb', rgb]
+    return item
+
+
+def array_dims(dims):
+    """ The three counts of an array command's dims (1 to 3 counts).
+        Raises ValueError if they are not valid.
+    """
+    if not 1 <= len(dims) <= 3:
+        raise ValueError(f'array of {len(dims)} dimensions (1 to 3)')
+    dims = (list(dims) + [1, 1])[:3]
+    n = int(np.prod(dims))
+    if n > MAX_ARRAY:
+        raise ValueError(f'array of {n} objects (at most {MAX_ARRAY})')
+    return dims
+
+
+def array_items(dims, shape, rgb, step):
+    """ Items for a grid of dims (1 to 3 counts) copies of shape """
+    dims = array_dims(dims)
+
+    kind, par = shape
+    if step is None:
+        radius = par[1] if kind == 'sphere' else max(par[1], par[3])
+        step = ARRAY_SPACING * radius
+    offsets = np.indices(dims).reshape(3, -1).T * step
+
+    pigment = [] if rgb is None else ['pigment', 'color', 'rgb', rgb]
+    if kind == 'sphere':
+        centers = (offsets + par[0]).tolist()
+        return [['sphere', [c, par[1]]] + pigment for c in centers]
+
+    tops = (offsets + par[0]).tolist()
+    bottoms = (offsets + par[2]).tolist()
+    return [['cone', [t, par[1], b, par[3]]] + pigment
+                for t, b in zip(tops, bottoms)]
+
+
+def targets(views, which):
+    if which == 'all':
+        return list(views.objs)
+    return [o for o in views.objs if o in views.selection]
+
+
+def centers(objs):
+    """ (n, 3) array of the centers of the objects (cones: of the axis) """
+    return np.array([o.center if isinstance(o, Sphere) else
+                     [(t + b)/2 for t, b in zip(o.tc, o.bc)]
+                        for o in objs], float).reshape(-1, 3)
+
+
+def transform(views, objs, factor = 1.0, offset = (0.0, 0.0, 0.0)):
+    """ Scale (around the origin), then move the objects """
+    spheres = [o for o in objs if isinstance(o, Sphere)]
+    if spheres:
+        c = np.array([s.center for s in spheres], float) * factor + offset
+        r = np.array([s.radius for s in spheres], float) * factor
+        for s, center, radius in zip(spheres, c.tolist(), r.tolist()):
+            s.center, s.radius = center, radius
+        views.build_wireframes(spheres)
+
+    cones = [o for o in objs if isinstance(o, Cone)]
+    if cones:
+        p = np.array([list(c.tc) + [c.tr] + list(c.bc) + [c.br]
+                        for c in cones], float) * factor
+        p[:, 0:3] += offset
+        p[:, 4:7] += offset
+        for c, par in zip(cones, p.tolist()):
+            c.tc, c.tr, c.bc, c.br = par[0:3], par[3], par[4:7], par[7]
+            c.create_wireframe()
+
+    views.draw_objects(objs)
+
+
+def cmd_add(views, args):
+    rgb = options(args[1:]).get('rgb')
+    objs = views.add_items([shape_item(args[0], rgb)])
+    views.selection = dict.fromkeys(objs)
+    return f'added {len(objs)}'
+
+
+def cmd_array(views, args):
+    dims, shape = args[0], args[1]
+    opts = options(args[2:])
+    objs = views.add_items(array_items(dims, shape, opts.get('rgb'),
+                                       opts.get('step')))
+    views.selection = dict.fromkeys(objs)
+    return f'added {len(objs)}'
+
+
+def cmd_select(views, args):
+    objs = views.objs
+    if args[0] == 'all':
+        selected = objs
+    elif args[0] == 'none':
+        selected = []
+    elif args[0] == 'spheres':
+        selected = [o for o in objs if isinstance(o, Sphere)]
+    elif args[0] == 'cones':
+        selected = [o for o in objs if isinstance(o, Cone)]
+    elif args[0] == 'inside':
+        lo = np.minimum(args[1], args[2])
+        hi = np.maximum(args[1], args[2])
+        c = centers(objs)
+        inside = np.all((c >= lo) & (c <= hi), axis = 1)
+        selected = [objs[i] for i in np.flatnonzero(inside)]
+    else:
+        first, last = args[0][0], args[0][-1]
+        selected = objs[first:last + 1]
+
+    views.selection = dict.fromkeys(selected)
+    return f'{len(selected)} selected'
+
+
+def cmd_scale(views, args):
+    objs = targets(views, args[0])
+    transform(views, objs, factor = args[1])
+    return f'scaled {len(objs)}'
+
+
+def cmd_move(views, args):
+    objs = targets(views, args[0])
+    transform(views, objs, offset = args[1])
+    return f'moved {len(objs)}'
+
+
+def cmd_rotate(views, args):
+    objs = targets(views, args[0])
+    angle = args[2] * pi / 180
+    for o in objs:
+        o.rotation[args[1]] += angle
+    views.build_wireframes([o for o in objs if isinstance(o, Sphere)])
+    for c in objs:
+        if isinstance(c, Cone):
+            c.create_wireframe()
+    views.draw_objects(objs)
+    return f'rotated {len(objs)}'
+
+
+def cmd_delete(views, args):
+    objs = targets(views, args[0])
+    views.delete_objects(objs)
+    return f'deleted {len(objs)}'
+
+
+COMMANDS = {'add': cmd_add, 'array': cmd_array, 'select': cmd_select,
+            'scale': cmd_scale, 'move': cmd_move, 'rotate': cmd_rotate,
+            'delete': cmd_delete}
+
+
+def run_commands(views, text):
+    """ Parse the commands, and apply them to the views as one batch.
+        Returns a message per command. Raises pp.ParseException for
+        syntax errors, and ValueError for invalid arrays: nothing is
+        changed then.
+    """
+    commands = parse_commands(text)
+    for command in commands:
+        if command[0] == 'array':
+            array_dims(command[1])
+
+    messages = []
+    views.begin_batch()
+    try:
+        for command in commands:
+            messages.append(COMMANDS[command[0]](views, command[1:]))
+    finally:
+        views.end_batch()
+        # The recorded slider values do not apply anymore
+        views.history.clear()
+    return messages
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_history.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+import time
+from collections import deque
+
+MAX_STEPS = 500                 # Undo steps kept
+COALESCE_TIME = 0.5             # Changes of the same parameter closer than
+                                # this (seconds) are one step (slider drags)
+
+
+def compact(values):
+    """ A single value if all are equal, else a tuple of the values """
+    values = tuple(values)
+    if values and all(v == values[0] for v in values):
+        return values[0]
+    return values
+
+
+def expand(value, n):
+    """ The inverse of compact, for n objects """
+    if isinstance(value, tuple):
+        return value
+    return (value,) * n
+
+
+class Delta:
+    __slots__ = ('key', 'old', 'new', 'time')
+
+    def __init__(self, key, old, new):
+        self.key, self.old, self.new = key, old, new
+        self.time = time.monotonic()
+
+
+class History:
+    """ Undo/redo of parameter changes.
+        Only the changed parameter is stored, as (key, old value, new
+        value); the geometry is not. The values are what the owner
+        chooses, preferably compacted (see compact()).
+        'apply' is called as apply(key, value) to restore a value.
+    """
+    def __init__(self, apply, max_steps = MAX_STEPS):
+        self.apply = apply
+        self.undo_steps = deque(maxlen = max_steps)
+        self.redo_steps = []
+
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps = []
+
+
+    def record(self, key, old, new):
+        if old == new:
+            return
+        self.redo_steps = []
+
+        last = self.undo_steps[-1] if self.undo_steps else None
+        if (last is not None and last.key == key and
+                    time.monotonic() - last.time < COALESCE_TIME):
+            last.new = new
+            last.time = time.monotonic()
+            if last.old == last.new:
+                self.undo_steps.pop()
+        else:
+            self.undo_steps.append(Delta(key, old, new))
+
+
+    def undo(self):
+        if not self.undo_steps:
+            return False
+        delta = self.undo_steps.pop()
+        self.apply(delta.key, delta.old)
+        self.redo_steps.append(delta)
+        return True
+
+
+    def redo(self):
+        if not self.redo_steps:
+            return False
+        delta = self.redo_steps.pop()
+        self.apply(delta.key, delta.new)
+        delta.time = 0              # Never merge into a redone step
+        self.undo_steps.append(delta)
+        return True
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_loader.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+
+""" Loading of scene files in a worker thread, so the GTK main loop keeps
+    running (and repainting) while a large file is read and parsed.
+    The loader itself does not use GTK: its callbacks are passed to 'call',
+    which is GLib.idle_add in the viewer, so they run in the main thread.
+"""
+
+import threading
+import time
+
+READ_CHUNK = 1 << 20            # Bytes read at a time
+PROGRESS_INTERVAL = 0.1         # Seconds between progress reports
+
+
+class Scene_loader:
+    """ Reads and parses one scene file in a worker thread.
+            fname       the .pov file
+            cache       block cache (see parse_blocks). It is not modified;
+                        a copy with the blocks of the new file is passed
+                        to on_done.
+            on_progress called as on_progress(loader, stage, done, total,
+                        items): stage is 'read' or 'parse', done and total
+                        are in bytes (read) or characters (parse)
+            on_done     called as on_done(loader, items, cache)
+            on_error    called as on_error(loader, exception) for read and
+                        parse errors
+            call        runs a callback: call(function, *args). The
+                        callbacks' return value is ignored, and must be
+                        False for GLib.idle_add.
+        No callback is queued after cancel() is called, but ones already
+        queued still run: the receiver should check that the loader is
+        the one it is waiting for.
+    """
+    def __init__(self, fname, cache, on_progress, on_done, on_error,
+                 call = None):
+        self.fname = fname
+        self.cache = dict(cache)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.call = call or (lambda function, *args: function(*args))
+
+        self.cancelled = threading.Event()
+        self.last_report = 0.0
+        self.thread = threading.Thread(target = self.run, daemon = True,
+                                       name = 'Scene_loader')
+
+
+    def start(self):
+        self.thread.start()
+        return self
+
+
+    def cancel(self):
+        """ Stop at the next chunk or block; the thread ends soon after """
+        self.cancelled.set()
+
+
+    @property
+    def running(self):
+        return self.thread.is_alive() and not self.cancelled.is_set()
+
+
+    def report(self, function, *args):
+        if not self.cancelled.is_set():
+            self.call(function, self, *args)
+
+
+    def progress(self, stage, done, total, items, force = False):
+        """ Report progress (at most every PROGRESS_INTERVAL seconds).
+            Returns False when cancelled.
+        """
+        if self.cancelled.is_set():
+            return False
+        now = time.monotonic()
+        if force or now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            self.report(self.on_progress, stage, done, total, items)
+        return True
+
+
+    def read(self):
+        """ The file's text, read in chunks; None if cancelled """
+        chunks = []
+        with open(self.fname, 'rb') as pov_file:
+            pov_file.seek(0, 2)
+            total = pov_file.tell()
+            pov_file.seek(0)
+            done = 0
+            while True:
+                chunk = pov_file.read(READ_CHUNK)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                done += len(chunk)
+                if not self.progress('read', done, total, 0):
+                    return None
+        return b''.join(chunks).decode()
+
+
+    def run(self):
+        # Imported here, in the worker: pyparsing takes a while to load
+        import pyparsing as pp
+        from povview_parser import parse_blocks
+
+        try:
+            text = self.read()
+            if text is None:
+                return
+            self.progress('parse', 0, len(text), 0, force = True)
+            items = parse_blocks(text, self.cache,
+                        lambda done, items:
+                                self.progress('parse', done, len(text), items))
+
+        except (OSError, UnicodeDecodeError, pp.ParseException) as err:
+            self.report(self.on_error, err)
+            return
+
+        if items is not None:
+            self.progress('parse', len(text), len(text), len(items),
+                          force = True)
+            self.report(self.on_done, items, self.cache)
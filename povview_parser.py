@@ -26,8 +26,21 @@
 # Pedro Diaz Romagnoli 2223997
 # Manuela Simes 2103975
 
+import re
 import pyparsing as pp
 
+BLOCK_KEYWORDS = ('sphere', 'cone', 'light_source')
+
+# Other POV-Ray blocks, which are valid but not shown (parse_blocks skips
+# them); any other text before a block is an error
+SKIPPED_KEYWORDS = ('camera', 'global_settings', 'background', 'fog',
+                    'sky_sphere', 'plane', 'box', 'cylinder', 'torus',
+                    'union', 'difference', 'intersection', 'merge',
+                    'object', 'polygon', 'mesh', 'text')
+
+# Braces, and what may contain braces which do not count
+BLOCK_TOKENS = re.compile(r'[{}]|//[^\n]*|/\*.*?\*/|"[^"]*"|#[^\n]*', re.S)
+
 
 def make_pov_parser(which = 'parser'):
      # Rule to ignore comments or #include directives
@@ -40,8 +53,9 @@ def make_pov_parser(which = 'parser'):
 
     expon = pp.one_of('e E') + sinteger
 
-    ufloat = pp.Combine(uinteger + pp.Optional('.' + uinteger) + pp.Optional(expon))
-    sfloat = pp.Combine(sinteger + pp.Optional('.' + uinteger) + pp.Optional(expon))
+    fraction = pp.Word(pp.nums)         # May have leading zeros (.05)
+    ufloat = pp.Combine(uinteger + pp.Optional('.' + fraction) + pp.Optional(expon))
+    sfloat = pp.Combine(sinteger + pp.Optional('.' + fraction) + pp.Optional(expon))
 
     uinteger.set_parse_action(lambda t: int(t[0]))
     sinteger.set_parse_action(lambda t: int(t[0]))
@@ -70,11 +84,17 @@ def make_pov_parser(which = 'parser'):
               pp.Group(vec3 + pp.Suppress(',') + ufloat) +
               pp.Optional(pigment) + pp.Suppress('}'))
 
+    # Cone: top center, top radius, bottom center, bottom radius
+    cone = pp.Group(pp.Keyword('cone') + pp.Suppress('{') +
+              pp.Group(vec3 + pp.Suppress(',') + ufloat + pp.Suppress(',') +
+                       vec3 + pp.Suppress(',') + ufloat) +
+              pp.Optional(pigment) + pp.Suppress('}'))
+
     light_source = pp.Group(pp.Keyword('light_source') + '{' +
                 vec3 + pp.Keyword('color') + color + '}')
 
     parser_basic = vec2 ^ vec3 ^ vec4 ^ sinteger ^ sfloat
-    parser_with_include = sphere + light_source
+    parser_with_include = sphere | cone | light_source
 
     # Add the include directive to be skipped
     # parser = pp.ZeroOrMore(include_directive) + parser_with_include
@@ -82,9 +102,134 @@ def make_pov_parser(which = 'parser'):
     # Set up the parser to ignore include directives and comments
     parser = pp.OneOrMore(parser_with_include).ignore(include_directive).ignore(comment_line)
 
+    # A single top level block (see split_blocks)
+    block = parser_with_include
+
+    # Commands of the command entry (see povview_commands), separated
+    # by ';'. A shape gives its item in the format above, less the pigment.
+    comma = pp.Optional(pp.Suppress(','))
+    target = pp.Keyword('all') | pp.Keyword('sel')
+    shape = pp.Group(
+              pp.Keyword('sphere') + pp.Group(vec3 + comma + ufloat) |
+              pp.Keyword('cone') + pp.Group(vec3 + comma + ufloat + comma +
+                                            vec3 + comma + ufloat))
+    times = pp.Suppress('x')
+    dims = pp.Group(uinteger + pp.Optional(times + uinteger +     # 1 to 3
+                                           pp.Optional(times + uinteger)))
+    selection = (pp.Keyword('all') | pp.Keyword('none') |
+              pp.Keyword('spheres') | pp.Keyword('cones') |
+              pp.Keyword('inside') + vec3 + vec3 |
+              pp.Group(uinteger + pp.Optional(pp.Suppress('-') + uinteger)))
+
+    command = pp.Group(
+              pp.Keyword('add') + shape + pp.Optional(color) |
+              pp.Keyword('array') + dims + shape + pp.Optional(color) +
+                        pp.Optional(pp.Keyword('step') + ufloat) |
+              pp.Keyword('scale') + target + ufloat |
+              pp.Keyword('rotate') + target + pp.one_of('x y z') + sfloat |
+              pp.Keyword('move') + target + vec3 |
+              pp.Keyword('delete') + target |
+              pp.Keyword('select') + selection)
+    commands = (command + pp.ZeroOrMore(pp.Suppress(';') + command) +
+              pp.Optional(pp.Suppress(';')))
+
     return eval(which)
 
 
+def split_blocks(text):
+    """ Split the text into its top level blocks ('name { ... }'),
+        skipping comments and directives between them. Returns a list of
+        (offset, block text). Raises pp.ParseException for unbalanced
+        braces, and for text left before a comment or after the last block.
+    """
+    blocks = []
+    depth = 0
+    start = 0
+    for m in BLOCK_TOKENS.finditer(text):
+        tok = m.group()
+        if tok == '{':
+            depth += 1
+        elif tok == '}':
+            if depth == 0:
+                raise pp.ParseException(text, m.start(), 'Unbalanced }')
+            depth -= 1
+            if depth == 0:
+                block = text[start:m.end()]
+                stripped = block.lstrip()
+                blocks.append((start + len(block) - len(stripped), stripped))
+                start = m.end()
+        elif depth == 0:
+            # Comment or directive between blocks
+            check_between(text, start, m.start())
+            start = m.end()
+
+    if depth != 0:
+        raise pp.ParseException(text, start + len(text[start:]) -
+                                len(text[start:].lstrip()),
+                                'Block not closed (missing })')
+    check_between(text, start, len(text))
+    return blocks
+
+
+def check_between(text, start, end):
+    """ Raise pp.ParseException if text[start:end], which is not part of a
+        block, is more than white space
+    """
+    stray = text[start:end]
+    if stray.strip():
+        raise pp.ParseException(text, start + len(stray) - len(stray.lstrip()),
+                    f'Expected one of {", ".join(BLOCK_KEYWORDS)}')
+
+
+def parse_blocks(text, cache = None, progress = None):
+    """ Parse the text block by block. Blocks found in 'cache' (a dict
+        from block text to parsed item) are not parsed again; the cache is
+        updated to contain exactly the blocks of this text.
+        Known blocks which are not shown (SKIPPED_KEYWORDS: camera...) are
+        skipped. Errors in object blocks, and blocks starting with
+        anything else, raise pp.ParseException.
+        progress    None, or called as progress(characters done, items)
+                    after each block. If it returns False, parsing stops
+                    and None is returned (the cache is not changed).
+    """
+    if cache is None:
+        cache = {}
+    parser = None
+    items = []
+    new_cache = {}
+
+    for offset, block in split_blocks(text):
+        header = block.split('{', 1)[0].strip()
+        if block in cache:
+            item = cache[block]
+        elif header in SKIPPED_KEYWORDS:
+            item = None
+        elif header not in BLOCK_KEYWORDS:
+            # E.g. a misspelled keyword, or stray text before a block
+            raise pp.ParseException(text, offset,
+                        f'Expected one of {", ".join(BLOCK_KEYWORDS)}')
+        else:
+            if parser is None:
+                parser = make_pov_parser('block')
+            try:
+                item = parser.parseString(block, parseAll = True)[0].as_list()
+            except pp.ParseException as err:
+                # Report the position in the complete text
+                raise pp.ParseException(text, offset + err.loc, err.msg)
+
+        new_cache[block] = item
+        if item is not None:
+            items.append(item)
+
+        if progress is not None and \
+                    progress(offset + len(block), len(items)) is False:
+            return None
+
+    cache.clear()
+    cache.update(new_cache)
+    return items
+
+
 def test_basic_parser():
     tests = ['123',
              '-123',
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_profile.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+TOP_N = 30                      # Lines in the sorted reports
+TRACE_FRAMES = 10               # Stack depth stored by tracemalloc
+
+
+class Profile_session:
+    """ A profiling session which can be started and stopped while the
+        viewer is running:
+            - cProfile measures the CPU time per function, of the thread
+              which starts the session and of the threads started during
+              it (e.g. the Scene_loader). Threads which were already
+              running are not included.
+            - tracemalloc registers the memory allocations
+        stop() writes, next to 'prefix':
+            <prefix>_<timestamp>.prof   cProfile data (snakeviz, pstats...)
+            <prefix>_<timestamp>.txt    top-N CPU and allocation reports
+        and returns the names of those files.
+    """
+    def __init__(self, prefix = 'povview_profile', top_n = TOP_N):
+        self.prefix = prefix
+        self.top_n = top_n
+        self.profiler = None
+        self.thread_profilers = []
+        self.lock = threading.Lock()
+
+
+    @property
+    def running(self):
+        return self.profiler is not None
+
+
+    def start(self):
+        if self.running:
+            return
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start(TRACE_FRAMES)
+        self.snapshot = tracemalloc.take_snapshot()
+        self.t_start = time.perf_counter()
+        self.profiler = cProfile.Profile()
+        self.thread_profilers = []
+        threading.setprofile(self.profile_thread)
+        self.profiler.enable()
+
+
+    def profile_thread(self, frame, event, arg):
+        """ Set with threading.setprofile, so it runs at the start of each
+            new thread: cProfile only profiles the thread enabling it, so
+            the thread gets a profiler of its own
+        """
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return      # Python 3.12+: one profiler already sees all threads
+        with self.lock:
+            self.thread_profilers.append(profiler)
+
+
+    def stop(self):
+        if not self.running:
+            return None
+        self.profiler.disable()
+        threading.setprofile(None)
+        with self.lock:
+            for profiler in self.thread_profilers:
+                profiler.disable()
+            self.stats = pstats.Stats(self.profiler, *self.thread_profilers,
+                                      stream = io.StringIO())
+            n_threads = len(self.thread_profilers)
+        elapsed = time.perf_counter() - self.t_start
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+        base = f"{self.prefix}_{time.strftime('%Y%m%d_%H%M%S')}"
+        prof_name, report_name = base + '.prof', base + '.txt'
+        self.stats.dump_stats(prof_name)
+
+        with open(report_name, 'w') as report:
+            report.write(f'Session: {elapsed:.2f} s (CPU: main thread, and '
+                         f'threads started during the session: {n_threads})'
+                         f'\n\n')
+            report.write(self.cpu_report())
+            report.write('\n')
+            report.write(self.memory_report(snapshot, current, peak))
+
+        self.profiler = None
+        self.thread_profilers = []
+        self.stats = None
+        self.snapshot = None
+        return prof_name, report_name
+
+
+    def cpu_report(self):
+        out = io.StringIO()
+        stats = self.stats
+        stats.stream = out
+        stats.strip_dirs()
+        for sort_key in ('cumulative', 'tottime'):
+            out.write(f'==== CPU: top {self.top_n} by {sort_key} ====\n')
+            stats.sort_stats(sort_key).print_stats(self.top_n)
+        return out.getvalue()
+
+
+    def memory_report(self, snapshot, current, peak):
+        out = io.StringIO()
+        out.write(f'==== Memory: top {self.top_n} allocations since start '
+                  f'(traced now {current/1024:.1f} KiB, '
+                  f'peak {peak/1024:.1f} KiB) ====\n')
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = (snapshot.filter_traces(filters)
+                        .compare_to(self.snapshot.filter_traces(filters),
+                                    'lineno'))
+        for stat in stats[:self.top_n]:
+            out.write(f'{stat}\n')
+        return out.getvalue()
+
+
+def main(args):
+    session = Profile_session()
+    session.start()
+    data = [list(range(i)) for i in range(2000)]
+    print(session.stop())
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main(sys.argv))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_scenegen.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+""" Synthetic scenes for load tests.
+    make_scene() returns the objects in the same form as the parser
+    (make_pov_parser) produces them, so they can be passed directly to
+    Views.add_object. scene_to_pov() converts them to .pov text.
+"""
+
+import random
+from math import ceil
+
+
+def _num(v):
+    return f'{round(v, 3):g}'
+
+
+def _vec(v):
+    return '<' + ', '.join(_num(c) for c in v) + '>'
+
+
+def _positions(n, layout, extent, rng):
+    """ n positions inside a cube of +/- extent """
+    if layout == 'grid':
+        side = max(1, ceil(round(n ** (1/3), 6)))
+        step = 2 * extent / side
+        return [[-extent + step * (i % side + 0.5),
+                 -extent + step * (i // side % side + 0.5),
+                 -extent + step * (i // (side * side) + 0.5)]
+                    for i in range(n)]
+
+    elif layout == 'random':
+        return [[rng.uniform(-extent, extent) for c in range(3)]
+                    for i in range(n)]
+
+    raise ValueError(f'Unknown layout: {layout}')
+
+
+def make_scene(n_spheres = 100, n_cones = 0, n_lights = 1,
+               layout = 'random', seed = 0,
+               extent = 500.0, radius = (5.0, 20.0), n_colors = 0):
+    """ Make a scene with the requested number of objects.
+            layout      'random' or 'grid' (spheres and cones share the grid)
+            seed        the same seed always produces the same scene
+            extent      objects are placed within +/- extent on each axis
+            radius      (min, max) of the sphere and cone radii
+            n_colors    objects take their color from a palette of this
+                        size; with 0, each object has a color of its own
+    """
+    rng = random.Random(seed)
+    positions = _positions(n_spheres + n_cones, layout, extent, rng)
+    scene = []
+    palette = [[round(rng.random(), 3) for c in range(3)]
+                    for i in range(n_colors)]
+
+    def random_color():
+        if palette:
+            return list(rng.choice(palette))
+        return [round(rng.random(), 3) for c in range(3)]
+
+    for pos in positions[:n_spheres]:
+        color = random_color()
+        scene.append(['sphere', [pos, rng.uniform(*radius)],
+                      'pigment', 'color', 'rgb', color])
+
+    for pos in positions[n_spheres:]:
+        height = rng.uniform(*radius) * 2
+        top = [pos[0], pos[1] + height/2, pos[2]]
+        bottom = [pos[0], pos[1] - height/2, pos[2]]
+        color = random_color()
+        scene.append(['cone', [top, rng.uniform(0, radius[0]),
+                               bottom, rng.uniform(*radius)],
+                      'pigment', 'color', 'rgb', color])
+
+    for i in range(n_lights):
+        pos = [rng.uniform(-2 * extent, 2 * extent) for c in range(3)]
+        scene.append(['light_source', '{', pos,
+                      'color', 'rgb', [1.0, 1.0, 1.0], '}'])
+
+    return scene
+
+
+def scene_to_pov(scene):
+    """ Convert a scene (parser format) to .pov text """
+    out = []
+    for item in scene:
+        if item[0] == 'sphere':
+            center, radius = item[1]
+            out.append(f'sphere {{\n    {_vec(center)}, {_num(radius)}\n')
+
+        elif item[0] == 'cone':
+            tc, tr, bc, br = item[1]
+            out.append(f'cone {{\n    {_vec(tc)}, {_num(tr)}, '
+                       f'{_vec(bc)}, {_num(br)}\n')
+
+        elif item[0] == 'light_source':
+            out.append(f'light_source {{\n    {_vec(item[2])}\n'
+                       f'    color rgb {_vec(item[5])}\n}}\n\n')
+            continue
+
+        else:
+            continue
+
+        if 'pigment' in item:
+            out.append(f'    pigment {{\n        color rgb {_vec(item[-1])}\n'
+                        '    }\n')
+        out.append('}\n\n')
+
+    out.append('camera {\n'
+               '    location <0, 0, -2000>\n'
+               '    look_at <0, 0, 0>\n'
+               '}\n')
+    return ''.join(out)
+
+
+def write_pov(fname, scene):
+    with open(fname, 'w') as pov_file:
+        pov_file.write(scene_to_pov(scene))
+
+
+def main(args):
+    """ povview_scenegen.py [spheres [cones [lights [layout [seed [colors]]]]]]
+        writes the scene to stdout
+    """
+    types = (int, int, int, str, int, int)
+    kwargs = dict(zip(('n_spheres', 'n_cones', 'n_lights', 'layout', 'seed',
+                       'n_colors'),
+                      (t(a) for t, a in zip(types, args[1:]))))
+    print(scene_to_pov(make_scene(**kwargs)), end = '')
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main(sys.argv))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_shm.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+""" Sphere wireframes calculated by worker processes.
+    The parameters of the spheres and the wireframe points are kept in one
+    shared memory block. The workers only receive the name of the block
+    and a range of spheres, and write the points directly into it, so
+    nothing but that description is pickled.
+"""
+
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.shared_memory import SharedMemory
+import os
+
+import numpy as np
+
+from povview_things import unit_sphere
+from povview_transform import rotation_matrices
+
+ALIGN = 64                      # Byte alignment of each array in the block
+CHUNK = 64                      # Spheres per worker task
+
+# The workers are started once, and not by forking the viewer, which
+# has threads of its own (GLib, the file loader)
+START_METHOD = ('forkserver' if 'forkserver' in get_all_start_methods()
+                    else 'spawn')
+_pool = None
+
+
+class Shared_scene:
+    """ Arrays in shared memory, for n spheres with a given subdivision:
+            centers     (n, 3)
+            radii       (n,)
+            rotations   (n, 3)      angles around x, y, z (radians)
+            vertices    (n, subdiv+1, subdiv+1, 3)
+                        the wireframe points, indexed [theta, phi] like
+                        Sphere.tx/ty/tz
+        Create with Shared_scene(n, subdiv), and attach to an existing block
+        (in a worker) with Shared_scene(*description).
+    """
+    def __init__(self, n, subdiv, name = None):
+        self.n, self.subdiv = n, subdiv
+        s = subdiv + 1
+        shapes = [('centers', (n, 3)), ('radii', (n,)),
+                  ('rotations', (n, 3)), ('vertices', (n, s, s, 3))]
+
+        offsets, size = [], 0
+        for field, shape in shapes:
+            offsets.append(size)
+            size += -(-int(np.prod(shape)) * 8 // ALIGN) * ALIGN
+
+        if name is None:
+            shm = SharedMemory(create = True, size = max(size, 1))
+        else:
+            shm = SharedMemory(name = name)
+
+        # The arrays are set before the SharedMemory, so they are released
+        # before it when this object is deleted.
+        for (field, shape), offset in zip(shapes, offsets):
+            setattr(self, field, np.ndarray(shape, dtype = np.float64,
+                                            buffer = shm.buf, offset = offset))
+        self.shm = shm
+
+
+    @property
+    def description(self):
+        return (self.n, self.subdiv, self.shm.name)
+
+
+    def load(self, spheres):
+        """ Copy the parameters of the spheres to the shared arrays """
+        for k, s in enumerate(spheres):
+            self.centers[k] = s.center
+            self.radii[k] = s.radius
+            self.rotations[k] = [s.rotation['x'], s.rotation['y'],
+                                 s.rotation['z']]
+
+
+    def close(self):
+        """ Release this process's mapping. Fails (BufferError) while
+            views of the vertices are still in use.
+        """
+        for field in ('centers', 'radii', 'rotations', 'vertices'):
+            setattr(self, field, None)
+        self.shm.close()
+
+
+def fill_vertices(scene, first, last):
+    """ Calculate the wireframes of spheres first..last-1 into
+        scene.vertices (the same points as Sphere.create_wireframe)
+    """
+    unit = unit_sphere(scene.subdiv)
+    m = rotation_matrices(scene.rotations[first:last])
+    out = scene.vertices[first:last]
+    np.einsum('ijk,nlk->nijl', unit, m, out = out)
+    out *= scene.radii[first:last, None, None, None]
+    out += scene.centers[first:last, None, None, :]
+
+
+def _worker(task):
+    description, first, last = task
+    scene = Shared_scene(*description)
+    fill_vertices(scene, first, last)
+    scene.close()
+
+
+def get_pool():
+    """ The worker pool, started on first use with one worker per CPU.
+        See shutdown_pool.
+    """
+    global _pool
+    if _pool is None:
+        _pool = get_context(START_METHOD).Pool(os.cpu_count() or 1)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+        _pool = None
+
+
+def build_wireframes(spheres, subdiv, parallel = True):
+    """ Calculate the wireframes of the spheres with the pool of
+        processes, and make each sphere use its part of the shared vertex
+        buffer (no copies). Each sphere keeps a reference to the
+        Shared_scene, which is released with the last of them.
+        parallel    False to calculate in this process. The pool is
+                    only used for more than one CHUNK of spheres, and
+                    more than one CPU.
+    """
+    scene = Shared_scene(len(spheres), subdiv)
+    scene.load(spheres)
+
+    tasks = [(scene.description, first, min(first + CHUNK, len(spheres)))
+                for first in range(0, len(spheres), CHUNK)]
+    if parallel and len(tasks) > 1 and (os.cpu_count() or 1) > 1:
+        get_pool().map(_worker, tasks)
+    else:
+        fill_vertices(scene, 0, len(spheres))
+
+    # The name is no longer needed; the memory stays mapped here
+    scene.shm.unlink()
+
+    for k, s in enumerate(spheres):
+        s.set_wireframe(scene.vertices[k])
+        # Set after the point arrays, so those are released first
+        s.shared_scene = scene
+    return scene
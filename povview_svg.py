@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_svg.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+""" Encoders for SVG path data, as used by GooCanvas.CanvasPath """
+
+from math import acos, atan2, ceil, cos, hypot, pi, sin, tan
+import re
+
+PATH_TOKENS = re.compile(r'([MLCZ])([^MLCZ]*)')
+
+
+def polyline_svg(us, vs, closed = True, visible = None):
+    """ Path through the points (us[i], vs[i]).
+        visible     None, or a flag per point. A segment is drawn if
+                    at least one of its ends is visible, so the outline
+                    continues up to the silhouette.
+    """
+    n = len(us)
+    if visible is None or all(visible):
+        svg = f"M{us[0]:g},{vs[0]:g} "
+        for i in range(1, n):
+            svg += f"L{us[i]:g},{vs[i]:g} "
+        if closed:
+            svg += "Z "
+        return svg
+
+    segments = [(i, i + 1) for i in range(n - 1)]
+    if closed:
+        segments.append((n - 1, 0))
+
+    svg = ""
+    pen = None                  # Point where the last segment ended
+    for a, b in segments:
+        if visible[a] or visible[b]:
+            if pen != a:
+                svg += f"M{us[a]:g},{vs[a]:g} "
+            svg += f"L{us[b]:g},{vs[b]:g} "
+            pen = b
+        else:
+            pen = None
+    return svg
+
+
+def ellipse_svg(c, a, b, t0 = 0.0, t1 = 2*pi):
+    """ Arc of the ellipse c + a cos(t) + b sin(t) (c, a and b are 2D),
+        from t0 to t1, as cubic Bézier curves of at most 90 degrees each.
+        A projected circle is an ellipse with the same parameter, and as
+        Bézier curves are preserved by affine projections, the error is
+        that of the circle's approximation (under 0.03% of the radius).
+    """
+    n = max(1, ceil((t1 - t0) / (pi/2) - 1e-9))
+    dt = (t1 - t0) / n
+    k = 4/3 * tan(dt/4)             # Control point distance, per radian
+
+    def point(t):
+        return (c[0] + a[0]*cos(t) + b[0]*sin(t),
+                c[1] + a[1]*cos(t) + b[1]*sin(t))
+
+    def tangent(t):
+        return (-a[0]*sin(t) + b[0]*cos(t),
+                -a[1]*sin(t) + b[1]*cos(t))
+
+    x0, y0 = point(t0)
+    svg = f"M{x0:g},{y0:g} "
+    for i in range(n):
+        ta, tb = t0 + i*dt, t0 + (i + 1)*dt
+        dxa, dya = tangent(ta)
+        x3, y3 = point(tb)
+        dxb, dyb = tangent(tb)
+        svg += (f"C{x0 + k*dxa:g},{y0 + k*dya:g} "
+                f"{x3 - k*dxb:g},{y3 - k*dyb:g} "
+                f"{x3:g},{y3:g} ")
+        x0, y0 = x3, y3
+    return svg
+
+
+def visible_intervals(k0, kc, ks, t0, t1, closed = False):
+    """ The parts of [t0, t1] where k0 + kc cos(t) + ks sin(t) >= 0
+        (e.g. the depth component of the normal along a circle).
+        With closed, [t0, t1] is a complete turn, and a part crossing t0
+        is returned as one interval (ending after t1).
+    """
+    amp = hypot(kc, ks)
+    if amp <= abs(k0):
+        return [(t0, t1)] if k0 >= 0 else []
+
+    # Visible within 'half' of the direction of the maximum
+    mid = atan2(ks, kc)
+    half = acos(-k0/amp)
+    intervals = []
+    for turn in range(-2, 3):
+        lo = max(t0, mid - half + 2*pi*turn)
+        hi = min(t1, mid + half + 2*pi*turn)
+        if hi > lo:
+            intervals.append((lo, hi))
+
+    if closed and len(intervals) > 1 and \
+                intervals[0][0] == t0 and intervals[-1][1] == t1:
+        first = intervals.pop(0)
+        last = intervals.pop()
+        intervals.append((last[0], first[1] + t1 - t0))
+    return intervals
+
+
+def projected_arc_svg(c, a, b, t0, t1, u, v,
+                      normal = None, closed = False):
+    """ Arc of the 3D circle (or ellipse) c + a cos(t) + b sin(t), from t0
+        to t1, projected on the canvas axes u and v.
+        normal      None, or (k0, kc, ks): the depth component of the
+                    normal is k0 + kc cos(t) + ks sin(t), and only the
+                    parts where it is not negative are drawn.
+    """
+    c2, a2, b2 = (c[u], c[v]), (a[u], a[v]), (b[u], b[v])
+    if normal is None:
+        return ellipse_svg(c2, a2, b2, t0, t1)
+
+    return ''.join(ellipse_svg(c2, a2, b2, lo, hi)
+                        for lo, hi in visible_intervals(*normal, t0, t1,
+                                                        closed = closed))
+
+
+def path_coordinates(data):
+    """ The numbers of path data (as written by the functions above: only
+        absolute M, L, C and Z), as a flat list x0, y0, x1, y1...
+    """
+    return [float(n) for n in data.replace(',', ' ').translate(
+                    str.maketrans('', '', 'MLCZ')).split()]
+
+
+def path_bounds(data):
+    """ (x0, y0, x1, y1) containing the path (and its control points),
+        None for an empty path
+    """
+    coords = path_coordinates(data)
+    if not coords:
+        return None
+    xs, ys = coords[0::2], coords[1::2]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def path_to_cairo(cr, data):
+    """ Add the path to the current path of the Cairo context cr """
+    for op, args in PATH_TOKENS.findall(data):
+        n = [float(a) for a in args.replace(',', ' ').split()]
+        if op == 'M':
+            cr.move_to(n[0], n[1])
+        elif op == 'L':
+            cr.line_to(n[0], n[1])
+        elif op == 'C':
+            cr.curve_to(*n[:6])
+        else:
+            cr.close_path()
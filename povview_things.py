@@ -27,22 +27,114 @@
 # Manuela Simes 2103975
 
 
-import gi
-gi.require_version('Gtk', '3.0')
-gi.require_version('GooCanvas', '2.0')
-from gi.repository import Gtk, GooCanvas
-
+from collections import OrderedDict
+from functools import lru_cache
 from math import cos, sin, pi
-from pdb import set_trace as st
 import numpy as np
 
+from povview_svg import polyline_svg, projected_arc_svg
+from povview_timing import timed
+from povview_transform import Transform
+
 SUBDIV = 12
 
+# Per view: the horizontal and vertical canvas axes, and the depth axis
+VIEW_AXES = {'xy': (0, 1, 2),
+             'yz': (2, 1, 0),
+             'zx': (2, 0, 1)}
+
+# Per view: the side of the depth axis the viewer is on (+1 or -1), for
+# points drawn as they are (spheres), with the canvas v axis pointing
+# down. POV-Ray uses a left handed frame, so the viewer sees (u, up, away)
+# as (x, y, z): this is det[e_u, e_v, e_d]. Cones are drawn with y
+# negated, which mirrors them, so they use the opposite sign.
+VIEW_DEPTH_SIGN = {'xy': 1,
+                   'yz': -1,
+                   'zx': 1}
+
+# Leave out the lines on the back side of the objects
+HIDE_BACKFACES = False
+
+# Draw circles as a few Bézier curves instead of SUBDIV line segments
+BEZIER_CURVES = False
+
+# Recently calculated sphere wireframes, so returning to a previous state
+# (undo, slider back and forth) does not calculate them again. Each slider
+# step adds an entry per sphere, so the number of entries follows the
+# scene (see set_geometry_cache_spheres), within GEOMETRY_CACHE_MEMORY.
+GEOMETRY_CACHE_STATES = 64          # Entries per sphere
+GEOMETRY_CACHE_MEMORY = 512 << 20   # Bytes of points, at most
+GEOMETRY_CACHE_SIZE = GEOMETRY_CACHE_STATES
+GEOMETRY_CACHE = OrderedDict()
+
+# GooCanvas is only imported when something is drawn, so the geometry
+# can be used (and imported quickly) without the GObject stack.
+GooCanvas = None
+
+def load_goocanvas():
+    global GooCanvas
+    if GooCanvas is None:
+        import gi
+        gi.require_version('Gtk', '3.0')
+        gi.require_version('GooCanvas', '2.0')
+        from gi.repository import GooCanvas
+    return GooCanvas
+
+
+def set_geometry_cache_spheres(n):
+    """ Keep GEOMETRY_CACHE_STATES wireframes for each of n spheres """
+    global GEOMETRY_CACHE_SIZE
+    GEOMETRY_CACHE_SIZE = GEOMETRY_CACHE_STATES * max(1, n)
+
+
+@lru_cache(maxsize = 8)
+def unit_sphere(subdiv):
+    """ The wireframe points of a sphere of radius 1 around the origin,
+        an array (subdiv+1, subdiv+1, 3) indexed [theta, phi]. Read only,
+        as it is shared.
+    """
+    theta = np.arange(subdiv + 1) * (2 * pi / subdiv)
+    phi = np.arange(subdiv + 1) * (pi / subdiv)
+    unit = np.stack([np.outer(np.cos(theta), np.sin(phi)),
+                     np.outer(np.sin(theta), np.sin(phi)),
+                     np.broadcast_to(np.cos(phi), (subdiv + 1, subdiv + 1))],
+                    axis = -1)
+    unit.flags.writeable = False
+    return unit
+
+
 class ThreeD_object:
     def __init__(self):
         pass
 
 
+    @property
+    def rotation(self):
+        """ Angles (radians) around x, y and z: a dict, which may be
+            changed in place. Kept by self.transform (see Transform).
+        """
+        return self.transform.rotation
+
+
+    @rotation.setter
+    def rotation(self, rotation):
+        self.transform.rotation = rotation
+
+
+    def redraw(self, views):
+        """ Remove the current canvas items and draw the object again """
+        self.remove_shapes()
+        self.draw_on(views)
+
+
+    def remove_shapes(self):
+        """ Remove the object's canvas items from all views """
+        for view in self.shapes:
+            if self.shapes[view]:
+                self.shapes[view].remove()
+        self.shapes = {}
+
+
 
 class Vec3:
     def __init__(self, x, y, z):
@@ -79,6 +171,45 @@ class RGB:
 
 
 
+class Color_table:
+    """ Interns colors: every distinct rgb gets one index, so objects can
+        be grouped by color (one canvas item per color, not per object).
+        The stroke colors are written as #rrggbb (not as names: GooCanvas
+        takes those from X11, where e.g. 'Orange' is not (1, 0.5, 0)).
+    """
+    def __init__(self):
+        self.index = {}
+        self.strokes = []
+        self.values = []
+
+
+    def __len__(self):
+        return len(self.strokes)
+
+
+    def intern(self, rgb):
+        """ Index of the color (an RGB, or a list/tuple of 3 floats) """
+        if isinstance(rgb, RGB):
+            rgb = rgb.rgb
+        key = tuple(float(c) for c in rgb)
+        if key not in self.index:
+            self.index[key] = len(self.strokes)
+            self.values.append(key)
+            self.strokes.append(
+                    '#' + ''.join(f'{round(min(max(c, 0), 1) * 255):02x}'
+                                    for c in key))
+        return self.index[key]
+
+
+    def stroke(self, index):
+        return self.strokes[index]
+
+
+    def rgb(self, index):
+        return self.values[index]
+
+
+
 class RGBA:
     def __init__(self, r, g, b, a):
         self.r, self.g, self.b, self.a = r, g, b, a
@@ -90,12 +221,16 @@ class Cone(ThreeD_object):
         tr      self.tr     float   Cone top radius
         bc      self.bc     vec3    Cone bottom center
         br      self.br     float   Cone bottom radius
+        color   self.color  RGB     Optional color
     """
-    def __init__(self, cone_par):
+    def __init__(self, cone_par, color=None):
         self.tc = cone_par[0]
         self.tr = cone_par[1]
         self.bc = cone_par[2]
         self.br = cone_par[3]
+        self.shapes = {}
+        self.color = color if color else RGB(1, 0, 0)
+        self.transform = Transform()    # Around the middle of the axis
 
         self.create_wireframe()
 
@@ -108,6 +243,7 @@ class Cone(ThreeD_object):
                 f' radius: {self.br:10g}\n')
 
 
+    @timed('create_wireframe')
     def create_wireframe(self):
         self.tx = []
         self.ty = []
@@ -126,6 +262,14 @@ class Cone(ThreeD_object):
             self.by += [-self.bc[1]]
             self.bz += [self.bc[2] + self.br * sin(dsub * i)]
 
+        if not self.transform.identity:
+            pivot = self.pivot()
+            for ring in ((self.tx, self.ty, self.tz),
+                         (self.bx, self.by, self.bz)):
+                p = self.transform.apply(np.array(ring).T, pivot)
+                for k in range(3):
+                    ring[k][:] = p[:, k].tolist()
+
         # ~ print(self.tx)
         # ~ print(self.ty)
         # ~ print(self.tz)
@@ -134,72 +278,96 @@ class Cone(ThreeD_object):
         # ~ print(self.bz)
 
 
+    def pivot(self):
+        """ The middle of the axis (y is flipped, as drawn) """
+        return [(self.tc[0] + self.bc[0])/2, -(self.tc[1] + self.bc[1])/2,
+                (self.tc[2] + self.bc[2])/2]
+
+
+    def to_item(self):
+        """ The cone in the parser's format (see povview_parser) """
+        return ['cone', [list(self.tc), self.tr, list(self.bc), self.br],
+                'pigment', 'color', 'rgb', list(self.color.rgb)]
+
+
+    def side_normals(self):
+        """ Outward normal of the side surface along each spoke """
+        normals = []
+        dsub = 2*pi/SUBDIV
+        # The ring axes, (1, 0, 0) and (0, 0, 1) before the rotation
+        ex, ey, ez = self.transform.matrix.T.tolist()
+        for i in range(SUBDIV):
+            c, s = cos(dsub * i), sin(dsub * i)
+            spoke = (self.bx[i] - self.tx[i], self.by[i] - self.ty[i],
+                     self.bz[i] - self.tz[i])
+            # Ring tangent x spoke direction, turned outward (away from
+            # the radial direction)
+            t = [-s*ex[k] + c*ez[k] for k in range(3)]
+            r = [c*ex[k] + s*ez[k] for k in range(3)]
+            n = [t[1]*spoke[2] - t[2]*spoke[1],
+                 t[2]*spoke[0] - t[0]*spoke[2],
+                 t[0]*spoke[1] - t[1]*spoke[0]]
+            if n[0]*r[0] + n[1]*r[1] + n[2]*r[2] < 0:
+                n = [-n[0], -n[1], -n[2]]
+            normals.append(n)
+        return normals
+
+
+    @timed('to_svg')
     def to_svg(self, side):
-        if side == 'xy':
-            # top surface
-            svg = f"M{self.tx[0]:g},{self.ty[0]:g} "
-            for s in range(1, SUBDIV):
-                svg += f"L{self.tx[s]:g},{self.ty[s]:g} "
-            svg += 'Z '
-
-            # bottom surface
-            svg += f"M{self.bx[0]:g},{self.by[0]:g} "
-            for s in range(1, SUBDIV):
-                svg += f"L{self.bx[s]:g},{self.by[s]:g} "
-            svg += 'Z '
-
-            # 'vertical' spokes
-            for s in range(SUBDIV):
-                svg += (f"M{self.tx[s]:g},{self.ty[s]:g} "
-                        f"L{self.bx[s]:g},{self.by[s]:g} ")
-
-        elif side == 'yz':
-            # top surface
-            svg = f"M{self.tz[0]:g},{self.ty[0]:g} "
-            for s in range(1, SUBDIV):
-                svg += f"L{self.tz[s]:g},{self.ty[s]:g} "
-            svg += 'Z '
-            
-            # bottom surface
-            svg += f"M{self.bz[0]:g},{self.by[0]:g} "
-            for s in range(1, SUBDIV):
-                svg += f"L{self.bz[s]:g},{self.by[s]:g} "
-            svg += 'Z '
-
-            # 'vertical' spokes
-            for s in range(SUBDIV):
-                svg += (f"M{self.tz[s]:g},{self.ty[s]:g} "
-                        f"L{self.bz[s]:g},{self.by[s]:g} ")
-
-        else:  # zx
-            # top surface
-            svg = f"M{self.tz[0]:g},{self.tx[0]:g} "
-            for s in range(1, SUBDIV):
-                svg += f"L{self.tz[s]:g},{self.tx[s]:g} "
-            svg += 'Z '
-            
-            # bottom surface
-            svg += f"M{self.bz[0]:g},{self.bx[0]:g} "
-            for s in range(1, SUBDIV):
-                svg += f"L{self.bz[s]:g},{self.bx[s]:g} "
-            svg += 'Z '
-
-            # 'vertical' spokes
+        u, v, d = VIEW_AXES[side]
+        top = (self.tx, self.ty, self.tz)
+        bottom = (self.bx, self.by, self.bz)
+
+        if BEZIER_CURVES and not HIDE_BACKFACES:
+            # Rings as Béziers (the clipped rings remain polylines)
+            svg = ""
+            pivot = self.pivot()
+            for c, r in ((self.tc, self.tr), (self.bc, self.br)):
+                c = self.transform.apply([c[0], -c[1], c[2]], pivot).tolist()
+                svg += projected_arc_svg(c,
+                                         self.transform.apply_vector([r, 0, 0]),
+                                         self.transform.apply_vector([0, 0, r]),
+                                         0, 2*pi, u, v)
             for s in range(SUBDIV):
-                svg += (f"M{self.tz[s]:g},{self.tx[s]:g} "
-                        f"L{self.bz[s]:g},{self.bx[s]:g} ")
-            
-        print(svg)
+                svg += (f"M{top[u][s]:g},{top[v][s]:g} "
+                        f"L{bottom[u][s]:g},{bottom[v][s]:g} ")
+            return svg
+
+        if HIDE_BACKFACES:
+            sign = -VIEW_DEPTH_SIGN[side]       # y is negated
+            spokes = [n[d] * sign >= 0 for n in self.side_normals()]
+            # The cap rings are visible where the side is, or completely
+            # if the cap itself faces the viewer. 'cap' is the outward
+            # normal of the top.
+            cap = self.transform.apply_vector([0, self.bc[1] - self.tc[1], 0])
+            top_visible = spokes if cap[d] * sign <= 0 else None
+            bottom_visible = spokes if cap[d] * sign >= 0 else None
+        else:
+            spokes = [True] * SUBDIV
+            top_visible = bottom_visible = None
+
+        svg = polyline_svg(top[u], top[v], visible = top_visible)
+        svg += polyline_svg(bottom[u], bottom[v], visible = bottom_visible)
+
+        # 'vertical' spokes
+        for s in range(SUBDIV):
+            if spokes[s]:
+                svg += (f"M{top[u][s]:g},{top[v][s]:g} "
+                        f"L{bottom[u][s]:g},{bottom[v][s]:g} ")
+
         return svg
 
 
+    @timed('draw_on')
     def draw_on(self, views):
+        load_goocanvas()
         for view in ['xy', 'yz', 'zx']:
             root = views[view]['canvas'].get_root_item()
-            GooCanvas.CanvasPath(
+            self.shapes[view] = GooCanvas.CanvasPath(
                         parent = root,
                         data = self.to_svg(view),
-                        line_width = 1, stroke_color = 'White',
+                        line_width = 1, stroke_color = 'Black',
                         fill_color = None)
 
 class Sphere(ThreeD_object):
@@ -208,11 +376,12 @@ class Sphere(ThreeD_object):
         radius      float   Radius of the self
         color       RGB     Optional color for the self
     """
-    def __init__(self, center, radius, color=None):
+    def __init__(self, center, radius, color=None, wireframe=True):
         self.center = center
         self.radius = radius
         self.shapes = {}  # Initialize shape to None
         self.color = color if color else RGB(1, 0, 0)  # Default color is red if not provided
+        self.transform = Transform()
         self.rotation = {'x': 0, 'y': 0, 'z': 0}  # Store rotation angles
         self.tx = []  # Points for longitude lines (horizontal slices)
         self.ty = []
@@ -220,103 +389,58 @@ class Sphere(ThreeD_object):
         self.bx = []  # Points for latitude lines (vertical slices)
         self.by = []
         self.bz = []
-        self.create_wireframe()
-
+        self.shared_scene = None    # Shared memory of the points, if any
+        if wireframe:   # False if the points will be set with set_wireframe
+            self.create_wireframe()
+
+    def set_wireframe(self, vertices):
+        """ Use precalculated wireframe points, an array of
+            (SUBDIV+1, SUBDIV+1, 3) indexed [theta, phi] (see povview_shm).
+            The arrays are views: nothing is copied.
+        """
+        self.tx, self.ty, self.tz = vertices[..., 0], vertices[..., 1], vertices[..., 2]
+        self.bx, self.by, self.bz = self.tx.T, self.ty.T, self.tz.T
+        # Cleared after the old points are replaced, so a shared block is
+        # released with the last sphere using it (build_wireframes sets
+        # it again)
+        self.shared_scene = None
+
+    def to_item(self):
+        """ The sphere in the parser's format (see povview_parser) """
+        return ['sphere', [list(self.center), self.radius],
+                'pigment', 'color', 'rgb', list(self.color.rgb)]
+
+    def geometry_key(self):
+        return (tuple(self.center), self.radius, SUBDIV,
+                self.rotation['x'], self.rotation['y'], self.rotation['z'])
+
+    @timed('create_wireframe')
     def create_wireframe(self):
         """Generate wireframe points for the sphere with rotation"""
-        dtheta = 2 * pi / SUBDIV
-        dphi = pi / SUBDIV
-        
-        # Clear existing points
-        self.tx = []
-        self.ty = []
-        self.tz = []
-        self.bx = []
-        self.by = []
-        self.bz = []
-
-        # Loop for horizontal divisions (longitude)
-        for i in range(SUBDIV + 1):
-            theta = i * dtheta
-            tx = []
-            ty = []
-            tz = []
-            for j in range(SUBDIV + 1):
-                phi = j * dphi
-                # Calculate initial point
-                x = self.center[0] + self.radius * sin(phi) * cos(theta)
-                y = self.center[1] + self.radius * sin(phi) * sin(theta)
-                z = self.center[2] + self.radius * cos(phi)
-                
-                # Apply rotation
-                rotated_point = self.rotate_point([x, y, z])
-                tx.append(rotated_point[0])
-                ty.append(rotated_point[1])
-                tz.append(rotated_point[2])
-
-            self.tx.append(tx)
-            self.ty.append(ty)
-            self.tz.append(tz)
-
-        # Loop for vertical divisions (latitude)
-        for j in range(SUBDIV + 1):
-            phi = j * dphi
-            bx = []
-            by = []
-            bz = []
-            for i in range(SUBDIV + 1):
-                theta = i * dtheta
-                x = self.center[0] + self.radius * sin(phi) * cos(theta)
-                y = self.center[1] + self.radius * sin(phi) * sin(theta)
-                z = self.center[2] + self.radius * cos(phi)
-                
-                # Apply rotation
-                rotated_point = self.rotate_point([x, y, z])
-                bx.append(rotated_point[0])
-                by.append(rotated_point[1])
-                bz.append(rotated_point[2])
-
-            self.bx.append(bx)
-            self.by.append(by)
-            self.bz.append(bz)
+        key = self.geometry_key()
+        if key in GEOMETRY_CACHE:
+            GEOMETRY_CACHE.move_to_end(key)
+            (self.tx, self.ty, self.tz,
+             self.bx, self.by, self.bz) = GEOMETRY_CACHE[key]
+            self.shared_scene = None
+            return
+
+        # All the points at once: scaled unit sphere, rotated around
+        # the center with the (cached) matrix of self.transform
+        center = np.asarray(self.center, float)
+        self.set_wireframe(self.transform.apply(
+                    center + self.radius * unit_sphere(SUBDIV), center))
+
+        GEOMETRY_CACHE[key] = (self.tx, self.ty, self.tz,
+                               self.bx, self.by, self.bz)
+        limit = min(GEOMETRY_CACHE_SIZE,
+                    GEOMETRY_CACHE_MEMORY // (3 * self.tx.nbytes))
+        while len(GEOMETRY_CACHE) > limit:
+            GEOMETRY_CACHE.popitem(last = False)
         
     def rotate_point(self, point):
-        """Apply rotation transformations to a point."""
-        # Convert point to numpy array for matrix operations
-        p = np.array([point[0], point[1], point[2]])
-        
-        # Create rotation matrices
-        rx = self.rotation['x']
-        ry = self.rotation['y']
-        rz = self.rotation['z']
-        
-        # Rotation matrix for X axis
-        Rx = np.array([
-            [1, 0, 0],
-            [0, np.cos(rx), -np.sin(rx)],
-            [0, np.sin(rx), np.cos(rx)]
-        ])
-        
-        # Rotation matrix for Y axis
-        Ry = np.array([
-            [np.cos(ry), 0, np.sin(ry)],
-            [0, 1, 0],
-            [-np.sin(ry), 0, np.cos(ry)]
-        ])
-        
-        # Rotation matrix for Z axis
-        Rz = np.array([
-            [np.cos(rz), -np.sin(rz), 0],
-            [np.sin(rz), np.cos(rz), 0],
-            [0, 0, 1]
-        ])
-        
-        # Apply rotations (order: Z, Y, X)
-        p = p - np.array(self.center)  # Move to origin
-        p = Rx @ Ry @ Rz @ p  # Apply rotations
-        p = p + np.array(self.center)  # Move back
-        
-        return p.tolist()
+        """ Apply the rotation (around the center) to a point """
+        return self.transform.apply(point, self.center).tolist()
 
     def __str__(self):
         return (f'Sphere:\n'
@@ -324,53 +448,75 @@ class Sphere(ThreeD_object):
                 f'Radius: {self.radius:10g}\n'
                 f'Color: {self.color}')
 
+    @timed('to_svg')
     def to_svg(self, side):
         """ Creates the SVG representation for the self using wireframe (projected views) """
-        svg = ""
-        if side == 'xy':
-            # Draw the wireframe for the xy-plane
-            for i in range(len(self.tx)):
-                svg += f"M{self.tx[i][0]:g},{self.ty[i][0]:g} "
-                for j in range(1, len(self.tx[i])):
-                    svg += f"L{self.tx[i][j]:g},{self.ty[i][j]:g} "
-                svg += "Z "
+        u, v, d = VIEW_AXES[side]
+        t = (self.tx, self.ty, self.tz)     # Longitude lines
+        b = (self.bx, self.by, self.bz)     # Latitude lines
 
-            for j in range(len(self.bx)):
-                svg += f"M{self.bx[j][0]:g},{self.by[j][0]:g} "
-                for i in range(1, len(self.bx[j])):
-                    svg += f"L{self.bx[j][i]:g},{self.by[j][i]:g} "
-                svg += "Z "
+        if BEZIER_CURVES:
+            return self.to_bezier_svg(side)
 
-        elif side == 'yz':
-            # Draw the wireframe for the yz-plane
+        if not HIDE_BACKFACES:
+            svg = ""
             for i in range(len(self.tx)):
-                svg += f"M{self.tz[i][0]:g},{self.ty[i][0]:g} "
-                for j in range(1, len(self.tx[i])):
-                    svg += f"L{self.tz[i][j]:g},{self.ty[i][j]:g} "
-                svg += "Z "
-
-            for j in range(len(self.bz)):
-                svg += f"M{self.bz[j][0]:g},{self.by[j][0]:g} "
-                for i in range(1, len(self.bz[j])):
-                    svg += f"L{self.bz[j][i]:g},{self.by[j][i]:g} "
-                svg += "Z "
-
-        else:  # zx-plane
-            for i in range(len(self.tx)):
-                svg += f"M{self.tz[i][0]:g},{self.tx[i][0]:g} "
-                for j in range(1, len(self.tx[i])):
-                    svg += f"L{self.tz[i][j]:g},{self.tx[i][j]:g} "
-                svg += "Z "
+                svg += polyline_svg(t[u][i], t[v][i])
+            for j in range(len(self.bx)):
+                svg += polyline_svg(b[u][j], b[v][j])
+            return svg
+
+        # The normal in a point is (point - center) / radius, so the point
+        # faces the viewer if it is not behind the center. The lines are
+        # not closed: that would join the poles through the sphere.
+        c = self.center[d]
+        sign = VIEW_DEPTH_SIGN[side]
+        svg = ""
+        for i in range(len(self.tx)):
+            svg += polyline_svg(t[u][i], t[v][i], closed = False,
+                                visible = [(p - c) * sign >= 0 for p in t[d][i]])
+        for j in range(len(self.bx)):
+            svg += polyline_svg(b[u][j], b[v][j], closed = False,
+                                visible = [(p - c) * sign >= 0 for p in b[d][j]])
+        return svg
 
-            for j in range(len(self.bz)):
-                svg += f"M{self.bz[j][0]:g},{self.bx[j][0]:g} "
-                for i in range(1, len(self.bz[j])):
-                    svg += f"L{self.bz[j][i]:g},{self.bx[j][i]:g} "
-                svg += "Z "
+    def rotated_axes(self):
+        """ The x, y and z axes of the sphere after its rotation """
+        return self.transform.matrix.T.tolist()
+
+    def to_bezier_svg(self, side):
+        """ The same lines as to_svg, but each circle (or half circle)
+            is encoded as 4 (or 2) Bézier curves, independent of SUBDIV.
+        """
+        u, v, d = VIEW_AXES[side]
+        sign = VIEW_DEPTH_SIGN[side]
+        c, r = self.center, self.radius
+        ex, ey, ez = self.rotated_axes()
+        svg = ""
 
+        # Longitude lines: c + r cos(phi) ez + r sin(phi) w, phi 0..pi
+        # (theta = 2 pi is the same line as theta = 0)
+        for i in range(SUBDIV):
+            theta = i * 2 * pi / SUBDIV
+            w = [cos(theta)*ex[k] + sin(theta)*ey[k] for k in range(3)]
+            normal = (0, sign*ez[d], sign*w[d]) if HIDE_BACKFACES else None
+            svg += projected_arc_svg(c, [r*e for e in ez], [r*e for e in w],
+                                     0, pi, u, v, normal)
+
+        # Latitude lines (the poles are points)
+        for j in range(1, SUBDIV):
+            phi = j * pi / SUBDIV
+            cj = [c[k] + r*cos(phi)*ez[k] for k in range(3)]
+            rj = r * sin(phi)
+            normal = ((sign*cos(phi)*ez[d], sign*sin(phi)*ex[d],
+                       sign*sin(phi)*ey[d]) if HIDE_BACKFACES else None)
+            svg += projected_arc_svg(cj, [rj*e for e in ex], [rj*e for e in ey],
+                                     0, 2*pi, u, v, normal, closed = True)
         return svg
 
+    @timed('draw_on')
     def draw_on(self, views):
+        load_goocanvas()
         for view in ['xy', 'yz', 'zx']:
             root = views[view]['canvas'].get_root_item()
             self.shapes[view] = GooCanvas.CanvasPath(
@@ -380,22 +526,8 @@ class Sphere(ThreeD_object):
                 fill_color=None
             )
 
-    
-    def redraw(self, views):
-        """Clear the canvas and redraw the sphere."""
-
-        # Remove old shapes
-        for view in self.shapes:
-            if self.shapes[view]:
-                self.shapes[view].remove()
-            
-        # Clear the shapes dictionary
-        self.shapes = {}
-        
-        # Now draw the updated sphere
-        self.draw_on(views)
 
-    def update_sphere_size(self, new_radius, views):
+    def update_sphere_size(self, new_radius, views = None):
         """ Update the radius of the self and regenerate its wireframe. """
         self.radius = new_radius
         self.tx = []  # Clear existing points
@@ -405,11 +537,12 @@ class Sphere(ThreeD_object):
         self.by = []
         self.bz = []
         self.create_wireframe()  # Recreate the self's geometry
-        self.redraw(views)
+        if views is not None:   # else the caller draws
+            self.redraw(views)
 
         
 
-    def update_sphere_subdivision(self, new_subdiv, views):
+    def update_sphere_subdivision(self, new_subdiv, views = None):
         """ Update the subdivision of the sphere and regenerate its wireframe. """
         global SUBDIV
         SUBDIV = int(new_subdiv)
@@ -420,58 +553,63 @@ class Sphere(ThreeD_object):
         self.by = []
         self.bz = []
         self.create_wireframe()  # Recreate the sphere with new subdivisions
-        self.redraw(views)
+        if views is not None:
+            self.redraw(views)
 
-    def update_rotation(self, axis, angle, views):
+    def update_rotation(self, axis, angle, views = None):
         """Update rotation angle for specified axis and redraw"""
         self.rotation[axis] = angle * pi / 180  # Convert degrees to radians
         self.create_wireframe()
-        self.redraw(views)
+        if views is not None:
+            self.redraw(views)
         
 
-class MainWindow(Gtk.Window):
-    def __init__(self):
-        super(MainWindow, self).__init__()
-        self.connect("destroy", lambda x: Gtk.main_quit())
-        self.set_default_size(400, 300)
-
-        self.canvas = GooCanvas.Canvas(
-                    automatic_bounds = True,
-                    bounds_from_origin = False,
-                    bounds_padding = 10)
-        cvroot = self.canvas.get_root_item()
-
-        # cone = Cone([[20, 20, 30], 20, [20, -30, 30], 30])
-
-        # Create a self object
-        sphere = Sphere([200, 150, 0], 50, RGB(1, 0, 0))  # Initialize RGB instance
-
-        self.path = GooCanvas.CanvasPath(
-                    parent = cvroot,
-                    data = sphere.to_svg('xy'),
-                    line_width = 1, stroke_color = 'Black',
-                    fill_color = None)
+def main(args):
+    load_goocanvas()
+    from gi.repository import Gtk
+
+    class MainWindow(Gtk.Window):
+        def __init__(self):
+            super(MainWindow, self).__init__()
+            self.connect("destroy", lambda x: Gtk.main_quit())
+            self.set_default_size(400, 300)
+
+            self.canvas = GooCanvas.Canvas(
+                        automatic_bounds = True,
+                        bounds_from_origin = False,
+                        bounds_padding = 10)
+            cvroot = self.canvas.get_root_item()
+
+            # cone = Cone([[20, 20, 30], 20, [20, -30, 30], 30])
+
+            # Create a self object
+            sphere = Sphere([200, 150, 0], 50, RGB(1, 0, 0))  # Initialize RGB instance
+
+            self.path = GooCanvas.CanvasPath(
+                        parent = cvroot,
+                        data = sphere.to_svg('xy'),
+                        line_width = 1, stroke_color = 'Black',
+                        fill_color = None)
 
-        bounds = self.canvas.get_bounds()
-        print('Bounds:', bounds)
-        self.set_scale(4)
+            bounds = self.canvas.get_bounds()
+            print('Bounds:', bounds)
+            self.set_scale(4)
 
-        print("SVG data:", sphere.to_svg('xy'))
+            print("SVG data:", sphere.to_svg('xy'))
 
-        # Draw the self on the canvas
-        sphere.draw_on({'xy': {'canvas': self.canvas}, 'yz': {'canvas': self.canvas}, 'zx': {'canvas': self.canvas}})
+            # Draw the self on the canvas
+            sphere.draw_on({'xy': {'canvas': self.canvas}, 'yz': {'canvas': self.canvas}, 'zx': {'canvas': self.canvas}})
 
-        self.add(self.canvas)
-        self.show_all()
+            self.add(self.canvas)
+            self.show_all()
 
-    def run(self):
-        Gtk.main()
+        def run(self):
+            Gtk.main()
 
-    def set_scale(self, scale):
-        self.canvas.set_scale(scale)
-        self.path.set_property('line_width', 1/scale)
+        def set_scale(self, scale):
+            self.canvas.set_scale(scale)
+            self.path.set_property('line_width', 1/scale)
 
-def main(args):
     mainwdw = MainWindow()
     mainwdw.run()
 
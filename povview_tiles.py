@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_tiles.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+
+""" Raster tile cache for the views.
+    The objects of a view are rendered into TILE_SIZE x TILE_SIZE pixel
+    Cairo image tiles, per zoom level. Repainting (e.g. while panning)
+    only copies the tiles; a tile is rendered again when an object
+    overlapping it changes. The tiles are kept under a memory budget,
+    dropping the least recently used ones.
+"""
+
+from collections import OrderedDict
+from math import ceil, floor
+
+import cairo
+import gi
+gi.require_version('GooCanvas', '2.0')
+from gi.repository import GooCanvas
+import numpy as np
+
+from povview_svg import path_bounds, path_to_cairo
+from povview_timing import timed
+
+TILE_SIZE = 256                 # Pixels
+MEMORY_BUDGET = 64 << 20        # Bytes of tile images, per view
+MAX_TILES = 4096                # Tiles kept, including empty ones
+
+
+class Tile_cache:
+    """ The tiles of one view.
+            colors      Color_table, for the colors of the styles
+        Objects are entered with update() and remove(); each has its path
+        data (canvas units), style and bounding box.
+    """
+    def __init__(self, colors, tile_size = TILE_SIZE,
+                 budget = MEMORY_BUDGET):
+        self.colors = colors
+        self.tile_size = tile_size
+        self.budget = budget
+        self.tiles = OrderedDict()  # (scale, tx, ty): surface, None if empty
+        self.scales = {}            # scale: number of tiles
+        self.memory = 0
+        self.objects = {}           # object: (bounds, style, path data)
+        self.index = None           # (objects, bounds array), see find
+        self.bounds = None          # Of all the objects
+
+
+    def update(self, o, path, style):
+        """ Enter or change an object, invalidating the tiles it covered
+            and those it covers now
+        """
+        self.remove(o)
+        bounds = path_bounds(path)
+        if bounds is None:
+            return
+        self.objects[o] = (bounds, style, path)
+        self.invalidate(bounds)
+
+
+    def remove(self, o):
+        if o in self.objects:
+            self.invalidate(self.objects.pop(o)[0])
+
+
+    def clear(self):
+        self.tiles.clear()
+        self.scales = {}
+        self.memory = 0
+        self.objects = {}
+        self.index = None
+        self.bounds = None
+
+
+    def tile_rect(self, key):
+        scale, tx, ty = key
+        size = self.tile_size / scale
+        return (tx * size, ty * size, (tx + 1) * size, (ty + 1) * size)
+
+
+    def invalidate(self, bounds):
+        """ Drop the tiles (of all zoom levels) overlapping bounds. A
+            margin of one line width is added.
+        """
+        self.index = None
+        self.bounds = None
+        if not self.tiles:
+            return
+
+        x0, y0, x1, y1 = bounds
+        x0, y0, x1, y1 = x0 - 1, y0 - 1, x1 + 1, y1 + 1
+        for scale in list(self.scales):
+            size = self.tile_size / scale
+            txs = range(floor(x0 / size), floor(x1 / size) + 1)
+            tys = range(floor(y0 / size), floor(y1 / size) + 1)
+            if len(txs) * len(tys) > len(self.tiles):
+                # Large compared to the cache: check the tiles instead
+                keys = [key for key in self.tiles if key[0] == scale and
+                            key[1] in txs and key[2] in tys]
+            else:
+                keys = [(scale, tx, ty) for ty in tys for tx in txs]
+            for key in keys:
+                if key in self.tiles:
+                    self.drop(key)
+
+
+    def drop(self, key):
+        if self.tiles.pop(key) is not None:
+            self.memory -= self.tile_size * self.tile_size * 4
+        self.scales[key[0]] -= 1
+        if not self.scales[key[0]]:
+            del self.scales[key[0]]
+
+
+    def scene_bounds(self):
+        """ (x0, y0, x1, y1) of all the objects, None if there are none """
+        if self.bounds is None and self.objects:
+            b = self.find_index()[1]
+            self.bounds = (b[:, 0].min(), b[:, 1].min(),
+                           b[:, 2].max(), b[:, 3].max())
+        return self.bounds
+
+
+    def find_index(self):
+        if self.index is None:
+            objs = list(self.objects)
+            bounds = np.array([self.objects[o][0] for o in objs],
+                              float).reshape(-1, 4)
+            self.index = (objs, bounds)
+        return self.index
+
+
+    def find(self, rect):
+        """ The objects whose bounds overlap rect (x0, y0, x1, y1) """
+        objs, b = self.find_index()
+        x0, y0, x1, y1 = rect
+        inside = ((b[:, 0] <= x1) & (b[:, 2] >= x0) &
+                  (b[:, 1] <= y1) & (b[:, 3] >= y0))
+        return [objs[i] for i in np.flatnonzero(inside)]
+
+
+    @timed('render_tile')
+    def render(self, key):
+        """ A new tile: an image surface, or None if nothing is in it """
+        scale = key[0]
+        x0, y0, x1, y1 = self.tile_rect(key)
+        objs = self.find((x0 - 1, y0 - 1, x1 + 1, y1 + 1))
+        if not objs:
+            return None
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                     self.tile_size, self.tile_size)
+        cr = cairo.Context(surface)
+        cr.scale(scale, scale)
+        cr.translate(-x0, -y0)
+        cr.set_line_width(1)
+
+        styles = {}
+        for o in objs:
+            bounds, style, path = self.objects[o]
+            styles.setdefault(style, []).append(path)
+        for style, paths in styles.items():
+            for path in paths:
+                path_to_cairo(cr, path)
+            cr.set_source_rgb(*self.colors.rgb(style))
+            cr.stroke()             # One stroke per color
+
+        surface.flush()
+        return surface
+
+
+    def tile(self, key):
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+
+        surface = self.render(key)
+        self.tiles[key] = surface
+        self.scales[key[0]] = self.scales.get(key[0], 0) + 1
+        if surface is not None:
+            self.memory += self.tile_size * self.tile_size * 4
+        while ((self.memory > self.budget or len(self.tiles) > MAX_TILES)
+                    and len(self.tiles) > 1):
+            self.drop(next(iter(self.tiles)))
+        return surface
+
+
+    @timed('blit_tiles')
+    def paint(self, cr, scale, rect):
+        """ Paint the part rect (canvas units) of the view on cr, which
+            is set up for canvas units at the given scale
+        """
+        scale = round(scale, 6)
+        size = self.tile_size / scale
+        x0, y0, x1, y1 = rect
+        for ty in range(floor(y0 / size), ceil(y1 / size)):
+            for tx in range(floor(x0 / size), ceil(x1 / size)):
+                surface = self.tile((scale, tx, ty))
+                if surface is None:
+                    continue
+                cr.save()
+                cr.translate(tx * size, ty * size)
+                cr.scale(1 / scale, 1 / scale)
+                cr.set_source_surface(surface, 0, 0)
+                cr.rectangle(0, 0, self.tile_size, self.tile_size)
+                cr.fill()
+                cr.restore()
+
+
+class Tile_item(GooCanvas.CanvasItemSimple):
+    """ Canvas item showing the tiles of a Tile_cache. It covers the
+        bounds of the cache's objects.
+    """
+    __gtype_name__ = 'PovviewTileItem'
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+
+    def do_simple_create_path(self, cr):
+        bounds = self.cache.scene_bounds()
+        if bounds is not None:
+            x0, y0, x1, y1 = bounds
+            cr.rectangle(x0 - 1, y0 - 1, x1 - x0 + 2, y1 - y0 + 2)
+
+
+    def do_simple_paint(self, cr, bounds):
+        self.cache.paint(cr, self.get_canvas().get_scale(),
+                         (bounds.x1, bounds.y1, bounds.x2, bounds.y2))
+
+
+    def do_simple_is_item_at(self, x, y, cr, is_pointer_event):
+        return False
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_timing.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+ROLLING_SAMPLES = 500           # Samples kept per stage for the percentiles
+TRACE_EVENTS = 100000           # Events kept for the trace export
+
+
+class Stage_timer:
+    """ Collects timings of the viewer's hot paths (create_wireframe,
+        to_svg, draw_on, repaint...).
+        The timer is disabled by default. While disabled, a timed
+        function only pays for one attribute test.
+        Per stage, the last ROLLING_SAMPLES durations are kept to calculate
+        percentiles, and every measurement is also kept as an event which
+        can be exported as a Chrome trace (chrome://tracing, Perfetto).
+    """
+    def __init__(self, maxlen = ROLLING_SAMPLES):
+        self.enabled = False
+        self.maxlen = maxlen
+        self.reset()
+
+
+    def reset(self):
+        self.samples = {}
+        self.events = deque(maxlen = TRACE_EVENTS)
+        self.t0 = time.perf_counter()
+
+
+    def add(self, stage, start, end):
+        """ Register a measurement (start and end from time.perf_counter) """
+        if stage not in self.samples:
+            self.samples[stage] = deque(maxlen = self.maxlen)
+        self.samples[stage].append(end - start)
+        self.events.append((stage, start, end, threading.get_ident()))
+
+
+    def timed(self, stage):
+        """ Decorator to time each call of a function as 'stage' """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.add(stage, start, time.perf_counter())
+            return wrapper
+        return decorator
+
+
+    def percentiles(self, stage, pcts = (50, 90, 99)):
+        """ Nearest-rank percentiles (in seconds) of the rolling samples """
+        s = sorted(self.samples.get(stage, ()))
+        if not s:
+            return [0.0 for p in pcts]
+        return [s[min(len(s) - 1, int(len(s) * p / 100))] for p in pcts]
+
+
+    def summary(self):
+        """ One line per stage, with p50/p90/p99 in milliseconds """
+        lines = [f"{'stage':<18}{'p50':>9}{'p90':>9}{'p99':>9}{'n':>7}"]
+        for stage in self.samples:
+            p50, p90, p99 = self.percentiles(stage)
+            lines.append(f'{stage:<18}{p50*1e3:9.2f}{p90*1e3:9.2f}'
+                         f'{p99*1e3:9.2f}{len(self.samples[stage]):7d}')
+        return '\n'.join(lines)
+
+
+    def export_chrome_trace(self, fname):
+        """ Write the collected events in Chrome's trace event format """
+        import json
+
+        pid = os.getpid()
+        events = [{'name': stage,
+                   'cat': 'povview',
+                   'ph': 'X',
+                   'ts': (start - self.t0) * 1e6,
+                   'dur': (end - start) * 1e6,
+                   'pid': pid,
+                   'tid': tid}
+                  for stage, start, end, tid in self.events]
+
+        with open(fname, 'w') as trace_file:
+            json.dump({'traceEvents': events,
+                       'displayTimeUnit': 'ms'}, trace_file)
+
+
+TIMER = Stage_timer()
+timed = TIMER.timed
+
+
+def main(args):
+    @timed('test')
+    def work(n):
+        return sum(i * i for i in range(n))
+
+    TIMER.enabled = True
+    for n in range(1000, 50000, 1000):
+        work(n)
+    print(TIMER.summary())
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main(sys.argv))
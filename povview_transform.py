@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  povview_transform.py
+#
+#  Copyright 2024 John Coppens <john@jcoppens.com>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+# Alumnos:
+# Mateo Negri Ocampo 2103108
+# Pedro Diaz Romagnoli 2223997
+# Manuela Simes 2103975
+
+
+""" Rotations of the objects.
+    An object turns around a pivot (its center) by angles around x, y and
+    z, in radians, composed as Rx @ Ry @ Rz:
+
+        p' = Rx @ Ry @ Rz @ (p - pivot) + pivot
+"""
+
+import numpy as np
+
+
+def rotation_matrices(rotations):
+    """ Rx @ Ry @ Rz for each row of angles (n, 3); returns (n, 3, 3) """
+    rotations = np.asarray(rotations, float).reshape(-1, 3)
+    cx, cy, cz = np.cos(rotations).T
+    sx, sy, sz = np.sin(rotations).T
+    m = np.empty((len(rotations), 3, 3))
+    m[:, 0, 0] = cy*cz
+    m[:, 0, 1] = -cy*sz
+    m[:, 0, 2] = sy
+    m[:, 1, 0] = sx*sy*cz + cx*sz
+    m[:, 1, 1] = -sx*sy*sz + cx*cz
+    m[:, 1, 2] = -sx*cy
+    m[:, 2, 0] = -cx*sy*cz + sx*sz
+    m[:, 2, 1] = cx*sy*sz + sx*cz
+    m[:, 2, 2] = cx*cy
+    return m
+
+
+class Transform:
+    """ The rotation of an object.
+            rotation    the object's angles {'x': rx, 'y': ry, 'z': rz}.
+                        The dict is shared, not copied: the object keeps
+                        changing it, and the composed matrix is calculated
+                        again only when the angles differ from the ones it
+                        was made for.
+    """
+    def __init__(self, rotation = None):
+        self.rotation = rotation if rotation is not None else \
+                            {'x': 0, 'y': 0, 'z': 0}
+        self.angles = None
+        self._matrix = None
+
+
+    @property
+    def matrix(self):
+        """ The composed 3x3 rotation matrix """
+        angles = (self.rotation['x'], self.rotation['y'], self.rotation['z'])
+        if angles != self.angles:
+            self._matrix = rotation_matrices([angles])[0]
+            self.angles = angles
+        return self._matrix
+
+
+    @property
+    def identity(self):
+        return not (self.rotation['x'] or self.rotation['y'] or
+                    self.rotation['z'])
+
+
+    def apply(self, points, pivot = None):
+        """ Rotate points, an array (..., 3), around pivot (default the
+            origin). Returns a new array of the same shape.
+        """
+        p = np.asarray(points, float)
+        if pivot is None:
+            return p @ self.matrix.T
+        pivot = np.asarray(pivot, float)
+        return (p - pivot) @ self.matrix.T + pivot
+
+
+    def apply_vector(self, v):
+        """ Rotate a direction (no pivot), as a list """
+        return (self.matrix @ np.asarray(v, float)).tolist()